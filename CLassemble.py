@@ -1,5 +1,6 @@
 import argparse
-from assembler.assemble import assemble
+from assembler.errors import Error
+from assembler.assemble import assemble_file, compile_file
 from assembler.virtual_machine import intel_machine, mips_machine
 from assembler.virtual_machine import riscv_machine
 
@@ -76,7 +77,7 @@ def reset_vms():
     riscv_machine.base = None
 
 
-def run_assemble(vm, base, code):
+def set_base(vm, base):
     if vm.flavor == "intel" or vm.flavor == "att":
         if base is None:
             base = "dec"
@@ -84,10 +85,24 @@ def run_assemble(vm, base, code):
         if base is None:
             base = "hex"
     vm.base = base
-    (last_instr, error, bit_code) = assemble(code, vm.flavor, vm)
+
+
+def run_assemble(vm, base, file_nm):
+    set_base(vm, base)
+    (last_instr, error, bit_code) = assemble_file(file_nm, vm)
     display_results(last_instr, error, vm)
 
 
+def run_compile(vm, base, file_nm, obj_nm, obj_dir):
+    set_base(vm, base)
+    try:
+        obj_nm = compile_file(file_nm, vm, obj_nm, obj_dir)
+    except Error as err:
+        print("Error: ", err.msg)
+        return
+    print("Wrote", obj_nm)
+
+
 def main():
     global intel_machine
     global mips_machine
@@ -104,7 +119,15 @@ def main():
     parser.add_argument("-x", help="base: hex", action="store_true")
     parser.add_argument("-d", help="base: decimal", action="store_true")
 
-    parser.add_argument("file", help="file path of asm file")
+    parser.add_argument("-c", "--compile",
+                        help="write an object file instead of running",
+                        action="store_true")
+    parser.add_argument("-o", help="object file path")
+    parser.add_argument("--obj-dir",
+                        help="directory to put the object file in, "
+                        + "named for the website to find")
+
+    parser.add_argument("file", help="file path of asm or object file")
 
     args = parser.parse_args()
 
@@ -132,13 +155,10 @@ def main():
     elif args.d:
         base = "dec"
 
-    file_nm = args.file
-    asm_file = open(file_nm, "r")
-    code = ""
-    for line in asm_file:
-        code += line
-
-    run_assemble(vm, base, code)
+    if args.compile:
+        run_compile(vm, base, args.file, args.o, args.obj_dir)
+    else:
+        run_assemble(vm, base, args.file)
 
 
 main()
@@ -1,14 +1,13 @@
 import logging
+import os
 
 from django.shortcuts import render
 
 from .models import AdminEmail
 from .models import Site
 from .forms import MainForm
-from assembler.virtual_machine import intel_machine, mips_machine
-from assembler.virtual_machine import riscv_machine
-from assembler.assemble import assemble, add_debug
-from assembler.virtual_machine import wasm_machine
+from assembler.assemble import assemble, add_debug, RunBudget
+from assembler.vm_pool import VMPool
 
 # for floating point to binary and back
 import struct
@@ -23,6 +22,13 @@ CLEAR = 'clear'
 HEADER = 'header'
 DATA_INIT = 'data_init'
 
+# compiled sample programs (see write_sample_programs.py):
+OBJ_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "objects")
+
+# let long programs finish, but don't let a runaway one hang the worker:
+WEB_MAX_INSTRUCTIONS = 100000
+WEB_MAX_SECONDS = 2.0
+
 MIPS = {'mips_asm': 'MIPS Assembly',
         'mips_mml': 'MIPS Mnemonic Machine Language'
         }
@@ -36,6 +42,18 @@ RISCV = {'riscv': 'RISC-V'
 
 WASM = {'wasm': 'WASM'}
 
+# each session gets machines of its own:
+vm_pool = VMPool()
+
+
+def get_machines(request):
+    """
+    Returns the Machines of the request's session.
+    """
+    if request.session.session_key is None:
+        request.session.save()
+    return vm_pool.get(request.session.session_key)
+
 
 def get_hdr():
     site_hdr = "Emu: a multi-language assembly emulator"
@@ -77,18 +95,13 @@ def hex_to_float(h):
 
 
 def welcome(request):
-    global intel_machine
-    global mips_machine
-    global riscv_machine
-    intel_machine.re_init()
-    mips_machine.re_init()
-    riscv_machine.re_init()
-    intel_machine.flavor = None
-    mips_machine.flavor = None
-    riscv_machine.flavor = None
-    intel_machine.base = None
-    mips_machine.base = None
-    riscv_machine.base = None
+    machines = get_machines(request)
+    with machines.lock:
+        machine_reinit(machines, False)
+        machine_flavor_reset(machines, False)
+        machines.intel_machine.base = None
+        machines.mips_machine.base = None
+        machines.riscv_machine.base = None
     site_hdr = get_hdr()
     return render(request, 'welcome.html', {HEADER: site_hdr})
 
@@ -165,22 +178,33 @@ def create_render_data(request, vm, form, site_hdr, last_instr, error,
         render_data['curr_reg'] = curr_reg
     return render_data
 
-def machine_reinit(wasm_machine_init_status = True):
+def machine_reinit(machines, wasm_machine_init_status = True):
 
-    intel_machine.re_init()
-    mips_machine.re_init()
-    riscv_machine.re_init()
+    machines.intel_machine.re_init()
+    machines.mips_machine.re_init()
+    machines.riscv_machine.re_init()
     if wasm_machine_init_status:
-        wasm_machine.re_init()
+        machines.wasm_machine.re_init()
 
-def machine_flavor_reset(wasm_machine_flavor_status = True):
-    intel_machine.flavor = None
-    riscv_machine.flavor = None
-    mips_machine.flavor = None
+def machine_flavor_reset(machines, wasm_machine_flavor_status = True):
+    machines.intel_machine.flavor = None
+    machines.riscv_machine.flavor = None
+    machines.mips_machine.flavor = None
     if wasm_machine_flavor_status:
-        wasm_machine.flavor = None
+        machines.wasm_machine.flavor = None
 
 def main_page(request):
+    machines = get_machines(request)
+    # one request at a time may use a session's machines:
+    with machines.lock:
+        return run_main_page(request, machines)
+
+
+def run_main_page(request, machines):
+    intel_machine = machines.intel_machine
+    mips_machine = machines.mips_machine
+    riscv_machine = machines.riscv_machine
+    wasm_machine = machines.wasm_machine
     last_instr = ""
     error = ""
     sample = "none"
@@ -193,14 +217,14 @@ def main_page(request):
                 mips_machine.flavor is None and
                 riscv_machine.flavor is None):
             return render(request, 'main_error.html', {HEADER: site_hdr})
-        machine_reinit()
+        machine_reinit(machines)
         form = MainForm()
     else:
         vm = None
         base = request.POST['base']
         if 'language' in request.POST:
-            machine_reinit()
-            machine_flavor_reset()
+            machine_reinit(machines)
+            machine_flavor_reset(machines)
             form = MainForm()
             lang = request.POST['language']
             if lang in MIPS:
@@ -254,7 +278,7 @@ def main_page(request):
         form = MainForm(request.POST)
         vm = None
         if 'flavor' in request.POST:
-            machine_flavor_reset()
+            machine_flavor_reset(machines)
             language = request.POST['flavor']
             if language in INTEL:
                 vm = intel_machine
@@ -273,7 +297,7 @@ def main_page(request):
         sample = request.POST['sample']
         button = request.POST['button_type']
         if button == CLEAR:
-            machine_reinit()
+            machine_reinit(machines)
         else:
             intel_machine.changes_init()
             mips_machine.changes_init()
@@ -303,8 +327,11 @@ def main_page(request):
             vm.data_init = request.POST[DATA_INIT]
             vm.start_ip = int(request.POST['start_ip'])
 
+            budget = RunBudget(WEB_MAX_INSTRUCTIONS, WEB_MAX_SECONDS)
             (last_instr, error, bit_code) = assemble(request.POST[CODE],
-                                                     vm, step)
+                                                     vm, step,
+                                                     budget=budget,
+                                                     obj_dir=OBJ_DIR)
     if button == DEMO:
         if (last_instr == "Reached end of executable code." or
                 last_instr.find("Exiting program") != -1):
@@ -314,7 +341,6 @@ def main_page(request):
     else:
         button = ""
 
-    vm.order_mem()
     hex_conversion(vm)
     if vm.flavor == 'wasm':
         return render(request, 'wasm.html',
@@ -480,15 +506,19 @@ def hex_conversion(vm):
 
 
 def help(request):
-    machine_reinit(False)
-    machine_flavor_reset(False)
+    machines = get_machines(request)
+    with machines.lock:
+        machine_reinit(machines, False)
+        machine_flavor_reset(machines, False)
     site_hdr = get_hdr()
     return render(request, 'help.html', {HEADER: site_hdr})
 
 
 def feedback(request):
-    machine_reinit(False)
-    machine_flavor_reset(False)
+    machines = get_machines(request)
+    with machines.lock:
+        machine_reinit(machines, False)
+        machine_flavor_reset(machines, False)
     site_hdr = get_hdr()
     email_list = AdminEmail.objects.all()
     comma_del_emails = ""
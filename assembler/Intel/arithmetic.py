@@ -5,8 +5,9 @@ arithmetic.py: arithmetic and logic instructions.
 import operator as opfunc
 
 from assembler.errors import DivisionZero, check_num_args, InvalidConVal, InvalidArgument
+from assembler.flags import add_flags, sub_flags, carry_flags
 from assembler.tokens import Instruction, MAX_INT
-from assembler.ops_check import one_op_arith
+from assembler.ops_check import one_op_arith, add_dest_change
 
 
 def two_op_arith(ops, vm, instr, operator):
@@ -15,18 +16,24 @@ def two_op_arith(ops, vm, instr, operator):
             +, -, *, etc.
     """
     check_num_args(instr, ops, 2)
-    ops[0].set_val(
-        checkflag(operator(ops[0].get_val(),
-                           ops[1].get_val()), vm))
-    vm.changes.add(ops[0].get_nm())
+    a = ops[0].get_val()
+    b = ops[1].get_val()
+    val = operator(a, b)
+    vm.flags.record(flag_funcs.get(operator, carry_flags), a, b, val)
+    ops[0].set_val(checkflag(val))
+    add_dest_change(ops[0], vm)
 
 
-def checkflag(val, vm):
+# the flags each operator sets are worked out by:
+flag_funcs = {
+    opfunc.add: add_flags,
+    opfunc.sub: sub_flags,
+}
+
+
+def checkflag(val):
     if(val > MAX_INT):
-        vm.flags['CF'] = 1
         val = val - MAX_INT+1
-    else:
-        vm.flags['CF'] = 0
     return val
 
 
@@ -180,7 +187,7 @@ class Inc(Instruction):
     def fhook(self, ops, vm):
         check_num_args(self.name, ops, 1)
         ops[0].set_val(ops[0].get_val() + 1)
-        vm.changes.add(ops[0].get_nm())
+        add_dest_change(ops[0], vm)
 
 
 class Dec(Instruction):
@@ -195,7 +202,7 @@ class Dec(Instruction):
     def fhook(self, ops, vm):
         check_num_args(self.name, ops, 1)
         ops[0].set_val(ops[0].get_val() - 1)
-        vm.changes.add(ops[0].get_nm())
+        add_dest_change(ops[0], vm)
 
 
 class Neg(Instruction):
@@ -244,8 +251,8 @@ class Idiv(Instruction):
             raise DivisionZero()
         vm.registers['EAX'] = dividend // ops[0].get_val()
         vm.registers['EDX'] = dividend % ops[0].get_val()
-        vm.changes.add('EAX')
-        vm.changes.add('EDX')
+        vm.changes.add_register('EAX')
+        vm.changes.add_register('EDX')
         return ''
 
 class BTR(Instruction):
@@ -1,12 +1,13 @@
 """
-control_flow.py: control flow instructions,
-    plus Exceptions to signal break in flow.
+control_flow.py: control flow instructions.
+    A taken jump returns the new instruction pointer.
 
 """
 
 from assembler.errors import check_num_args
+from assembler.flags import cmp_flags
 from assembler.tokens import Instruction
-from assembler.flowbreak import Jump
+from assembler.flowbreak import label_target
 from assembler.ops_check import get_one_op, get_two_ops
 
 
@@ -21,28 +22,16 @@ class Cmpf(Instruction):
             CMP reg, con
         </syntax>
         <descr>
-            Compares op1 and op2, and sets (right now) the SF and ZF flags.
-            It is not clear at this moment how to
-            treat the OF and CF flags in Python,
-            since Python integer arithmetic never carries or overflows!
+            Compares op1 and op2, and sets the SF, ZF, CF and OF flags.
+            CF and OF are those of a 32-bit subtraction.
         </descr>
     """
     def fhook(self, ops, vm):
         (op1, op2) = get_two_ops(self.get_nm(), ops)
-        res = op1.get_val() - op2.get_val()
-        # set the proper flags
-        # zero flag:
-        if res == 0:
-            vm.flags['ZF'] = 1
-        else:
-            vm.flags['ZF'] = 0
-        # sign flag:
-        if res < 0:
-            vm.flags['SF'] = 1
-        else:
-            vm.flags['SF'] = 0
-        vm.changes.add('FLAGZF')
-        vm.changes.add('FLAGSF')
+        a = op1.get_val()
+        b = op2.get_val()
+        # the flags are worked out when they are looked at:
+        vm.flags.record(cmp_flags, a, b, a - b)
 
 
 class Jmp(Instruction):
@@ -56,7 +45,7 @@ class Jmp(Instruction):
     """
     def fhook(self, ops, vm):
         target = get_one_op(self.get_nm(), ops)
-        raise Jump(target.name)
+        return label_target(target, vm)
 
 
 class Je(Instruction):
@@ -75,7 +64,7 @@ class Je(Instruction):
     def fhook(self, ops, vm):
         target = get_one_op(self.get_nm(), ops)
         if int(vm.flags['ZF']) == 1:
-            raise Jump(target.name)
+            return label_target(target, vm)
 
 
 class Jne(Instruction):
@@ -94,7 +83,7 @@ class Jne(Instruction):
     def fhook(self, ops, vm):
         target = get_one_op(self.get_nm(), ops)
         if int(vm.flags['ZF']) == 0:
-            raise Jump(target.name)
+            return label_target(target, vm)
 
 
 class Jg(Instruction):
@@ -114,7 +103,7 @@ class Jg(Instruction):
         target = get_one_op(self.get_nm(), ops)
         if (int(vm.flags['SF']) == 0 and
                 int(vm.flags['ZF']) == 0):
-            raise Jump(target.name)
+            return label_target(target, vm)
 
 
 class Jge(Instruction):
@@ -132,8 +121,7 @@ class Jge(Instruction):
     def fhook(self, ops, vm):
         target = get_one_op(self.get_nm(), ops)
         if int(vm.flags['SF']) == 0:
-            raise Jump(target.name)
-        return ''
+            return label_target(target, vm)
 
 
 class Jl(Instruction):
@@ -152,8 +140,7 @@ class Jl(Instruction):
     def fhook(self, ops, vm):
         target = get_one_op(self.get_nm(), ops)
         if int(vm.flags['SF']) == 1:
-            raise Jump(target.name)
-        return ''
+            return label_target(target, vm)
 
 
 class Jle(Instruction):
@@ -172,8 +159,7 @@ class Jle(Instruction):
         target = get_one_op(self.get_nm(), ops)
         if (int(vm.flags['SF']) == 1 or
                 int(vm.flags['ZF']) == 1):
-            raise Jump(target.name)
-        return ''
+            return label_target(target, vm)
 
 
 class Call(Instruction):
@@ -191,10 +177,10 @@ class Call(Instruction):
     def fhook(self, ops, vm):
         check_num_args("CALL", ops, 1)
         vm.dec_sp()
-        vm.stack[hex(vm.get_sp() + 1).split('x')[-1].upper()] = vm.get_ip()
+        vm.stack.store(vm.get_sp() + 1, vm.get_ip())
         target = get_one_op(self.get_nm(), ops)
         vm.c_stack.append(vm.get_ip())
-        raise Jump(target.name)
+        return label_target(target, vm)
 
 
 class Ret(Instruction):
@@ -213,8 +199,8 @@ class Ret(Instruction):
     def fhook(self, ops, vm):
         check_num_args("RET", ops, 0)
         vm.inc_sp()
-        vm.set_ip(int(vm.stack[hex(vm.get_sp()).split('x')[-1].upper()]))
-        vm.stack[hex(vm.get_sp()).split('x')[-1].upper()] = vm.empty_cell()
+        vm.set_ip(int(vm.stack.load(vm.get_sp())))
+        vm.stack.store(vm.get_sp(), vm.empty_cell())
         while not isinstance(vm.c_stack[-1], int):
             vm.c_stack.pop()
         if isinstance(vm.c_stack[-1], int):
@@ -65,9 +65,9 @@ class Mov(Instruction):
         check_num_args(self.get_nm(), ops, 2)
         ops[0].set_val(ops[1].get_val())
         if isinstance(ops[0], Register):
-            vm.changes.add(ops[0].get_nm())
+            vm.changes.add_register(ops[0].get_nm())
         elif isinstance(ops[0], Address):
-            vm.changes.add(f'MEM{ops[0].get_mem_addr()}')
+            vm.changes.add_memory(ops[0].get_addr())
 
 
 class Pop(Instruction):
@@ -88,9 +88,9 @@ class Pop(Instruction):
     def fhook(self, ops, vm):
         vm.inc_sp()
         check_num_args("POP", ops, 1)
-        val = int(vm.stack[hex(vm.get_sp()).split('x')[-1].upper()])
+        val = int(vm.stack.load(vm.get_sp()))
         ops[0].set_val(val)
-        vm.stack[hex(vm.get_sp()).split('x')[-1].upper()] = vm.empty_cell()
+        vm.stack.store(vm.get_sp(), vm.empty_cell())
 
 
 class Push(Instruction):
@@ -113,8 +113,7 @@ class Push(Instruction):
     def fhook(self, ops, vm):
         vm.dec_sp()
         check_num_args("PUSH", ops, 1)
-        vm.stack[hex(vm.get_sp() +
-                     1).split('x')[-1].upper()] = ops[0].get_val()
+        vm.stack.store(vm.get_sp() + 1, ops[0].get_val())
 
 
 class Lea(Instruction):
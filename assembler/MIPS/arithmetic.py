@@ -18,7 +18,7 @@ def three_op_arith_reg(ops, vm, instr, operator):
     check_reg_only(instr, ops)
     ops[0].set_val(check_overflow(operator(ops[1].get_val(),
                                            ops[2].get_val()), vm))
-    vm.changes.add(ops[0].get_nm())
+    vm.changes.add_register(ops[0].get_nm())
 
 
 def three_op_arith_immediate(ops, vm, instr, operator):
@@ -30,7 +30,7 @@ def three_op_arith_immediate(ops, vm, instr, operator):
     check_immediate_three(instr, ops)
     ops[0].set_val(check_overflow(operator(ops[1].get_val(),
                                            ops[2].get_val()), vm))
-    vm.changes.add(ops[0].get_nm())
+    vm.changes.add_register(ops[0].get_nm())
 
 
 def check_overflow(val, vm):
@@ -97,8 +97,8 @@ class Mult(Instruction):
         else:
             vm.registers['LO'] = result
             vm.registers['HI'] = 0
-        vm.changes.add('LO')
-        vm.changes.add('HI')
+        vm.changes.add_register('LO')
+        vm.changes.add_register('HI')
         return ''
 
 
@@ -239,8 +239,8 @@ class Div(Instruction):
         remainder = ops[0].get_val() % ops[1].get_val()
         vm.registers['LO'] = quotient
         vm.registers['HI'] = remainder
-        vm.changes.add('LO')
-        vm.changes.add('HI')
+        vm.changes.add_register('LO')
+        vm.changes.add_register('HI')
         return ''
 
 
@@ -263,7 +263,7 @@ class Mfhi(Instruction):
         if not isinstance(ops[0], Register):
             raise InvalidArgument(ops[0].get_nm())
         ops[0].set_val(vm.registers['HI'])
-        vm.changes.add(ops[0].get_nm())
+        vm.changes.add_register(ops[0].get_nm())
         return ''
 
 
@@ -286,6 +286,6 @@ class Mflo(Instruction):
         if not isinstance(ops[0], Register):
             raise InvalidArgument(ops[0].get_nm())
         ops[0].set_val(vm.registers['LO'])
-        vm.changes.add(ops[0].get_nm())
+        vm.changes.add_register(ops[0].get_nm())
         return ''
 
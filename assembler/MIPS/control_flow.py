@@ -1,12 +1,12 @@
 """
-control_flow.py: control flow instructions,
-    plus Exceptions to signal break in flow.
+control_flow.py: control flow instructions.
+    A taken jump returns the new instruction pointer.
 
 """
 
 from assembler.errors import check_num_args, InvalidArgument, OutofBounds
-from assembler.tokens import Instruction, Register, IntegerTok
-from assembler.flowbreak import Jump
+from assembler.tokens import Instruction, Register, IntegerTok, Label
+from assembler.flowbreak import label_target, word_target
 from assembler.ops_check import get_one_op
 from .argument_check import check_reg_only, check_immediate_three
 
@@ -46,7 +46,7 @@ class Slt(Instruction):
             op1.set_val(1)
         else:
             op1.set_val(0)
-        vm.changes.add(op1.get_nm())
+        vm.changes.add_register(op1.get_nm())
 
 
 class Slti(Instruction):
@@ -73,7 +73,7 @@ class Slti(Instruction):
             op1.set_val(1)
         else:
             op1.set_val(0)
-        vm.changes.add(op1.get_nm())
+        vm.changes.add_register(op1.get_nm())
 
 
 class Jmp(Instruction):
@@ -89,9 +89,9 @@ class Jmp(Instruction):
     def fhook(self, ops, vm):
         target = get_one_op(self.get_nm(), ops)
         if isinstance(target, IntegerTok):
-            raise Jump(str(target.get_val()))
+            return word_target(target.get_val())
         else:
-            raise Jump(target.name)
+            return label_target(target, vm)
 
 
 class Jal(Instruction):
@@ -105,7 +105,10 @@ class Jal(Instruction):
     """
     def fhook(self, ops, vm):
         target = get_one_op(self.get_nm(), ops)
-        raise Jump(str(target.get_val()))
+        vm.registers["R31"] = vm.get_ip()
+        if isinstance(target, Label):
+            return label_target(target, vm)
+        return word_target(target.get_val())
 
 
 class Jr(Instruction):
@@ -119,7 +122,7 @@ class Jr(Instruction):
     """
     def fhook(self, ops, vm):
         target = get_one_op(self.get_nm(), ops)
-        raise Jump(str(target.get_val()))
+        return int(target.get_val())
 
 
 class Beq(Instruction):
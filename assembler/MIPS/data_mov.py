@@ -23,7 +23,7 @@ class Load(Instruction):
         if isinstance(ops[0], Register):
             if isinstance(ops[1], RegAddress):
                 ops[0].set_val(ops[1].get_val())
-                vm.changes.add(ops[0].get_nm())
+                vm.changes.add_register(ops[0].get_nm())
             else:
                 raise InvalidArgument(ops[1].get_nm())
         else:
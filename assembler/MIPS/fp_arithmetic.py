@@ -42,7 +42,7 @@ def three_op_arith_reg(ops, vm, instr, operator):
     # check_overflow(operator(ops[1].get_val(),
     #                    ops[2].get_val()),
     #                    vm))
-    vm.changes.add(ops[0].get_nm())
+    vm.changes.add_register(ops[0].get_nm())
 
 
 # to convert a float to a hex
@@ -110,7 +110,7 @@ class Mults(Instruction):
             raise TooBigForSingle(str(result))
 
         ops[0].set_val(result)
-        vm.changes.add(ops[0].get_nm())
+        vm.changes.add_register(ops[0].get_nm())
         return ''
 
 
@@ -136,7 +136,7 @@ class Divs(Instruction):
         if (result > 2 ** 22):
             raise TooBigForSingle(str(result))
         ops[0].set_val(result)
-        vm.changes.add(ops[0].get_nm())
+        vm.changes.add_register(ops[0].get_nm())
         return ''
 
 ########################
@@ -242,7 +242,7 @@ def three_op_double_arith_reg(ops, vm, instr, operator):
     ops[0].set_val(res_first_32)
     vm.registers[next_reg] = res_last_32
 
-    vm.changes.add(ops[0].get_nm())
+    vm.changes.add_register(ops[0].get_nm())
     # vm.changes.add(vm.registers[curr_reg])
     vm.changes.add(vm.registers[next_reg])
 
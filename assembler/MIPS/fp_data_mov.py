@@ -57,7 +57,7 @@ class Loadc(Instruction):
                 # if (float(ops[1].get_val()) > float(2 ** 22)):
                 #     raise TooBigForSingle(str(float(ops[1].get_val())))
                 ops[0].set_val(float(ops[1].get_val()))
-                vm.changes.add(ops[0].get_nm())
+                vm.changes.add_register(ops[0].get_nm())
             else:
                 raise InvalidArgument(ops[1].get_nm())
         else:
@@ -120,8 +120,8 @@ class LoadDouble(Instruction):
 
                 ops[0].set_val(first_half)
                 vm.registers[next_reg] = second_half
-                vm.changes.add(ops[0].get_nm())
-                vm.changes.add(next_reg)
+                vm.changes.add_register(ops[0].get_nm())
+                vm.changes.add_register(next_reg)
             else:
                 raise InvalidArgument(ops[1].get_nm())
         else:
@@ -20,7 +20,7 @@ def three_op_arith_reg(ops, vm, instr, operator):
     check_reg_only(instr, ops)
     ops[0].set_val(check_overflow(operator(ops[1].get_val(),
                    ops[2].get_val()), vm))
-    vm.changes.add(ops[0].get_nm())
+    vm.changes.add_register(ops[0].get_nm())
 
 
 def three_op_arith_immediate(ops, vm, instr, operator):
@@ -32,7 +32,7 @@ def three_op_arith_immediate(ops, vm, instr, operator):
     check_immediate_three(instr, ops)
     ops[0].set_val(check_overflow(operator(ops[1].get_val(),
                    ops[2].get_val()), vm))
-    vm.changes.add(ops[0].get_nm())
+    vm.changes.add_register(ops[0].get_nm())
 
 
 def get_three_ops(instr, ops):
@@ -221,7 +221,7 @@ class Srl(Instruction):
         fixed_op2 = ops[2].get_val() % 32
         ops[0].set_val(check_overflow(opfunc.rshift(ops[1].get_val(),
                        fixed_op2), vm))
-        vm.changes.add(ops[0].get_nm())
+        vm.changes.add_register(ops[0].get_nm())
 
 
 class Srli(Instruction):
@@ -252,7 +252,7 @@ class Sll(Instruction):
         fixed_op2 = ops[2].get_val() % 32
         ops[0].set_val(check_overflow(opfunc.lshift(ops[1].get_val(),
                        fixed_op2), vm))
-        vm.changes.add(ops[0].get_nm())
+        vm.changes.add_register(ops[0].get_nm())
 
 
 class Slli(Instruction):
@@ -283,7 +283,7 @@ class Slt(Instruction):
             op1.set_val(1)
         else:
             op1.set_val(0)
-        vm.changes.add(op1.get_nm())
+        vm.changes.add_register(op1.get_nm())
 
 
 class Sltu(Instruction):
@@ -303,7 +303,7 @@ class Sltu(Instruction):
             op1.set_val(1)
         else:
             op1.set_val(0)
-        vm.changes.add(op1.get_nm())
+        vm.changes.add_register(op1.get_nm())
 
 
 class Slti(Instruction):
@@ -321,7 +321,7 @@ class Slti(Instruction):
             op1.set_val(1)
         else:
             op1.set_val(0)
-        vm.changes.add(op1.get_nm())
+        vm.changes.add_register(op1.get_nm())
 
 
 class Sltiu(Instruction):
@@ -341,7 +341,7 @@ class Sltiu(Instruction):
             op1.set_val(1)
         else:
             op1.set_val(0)
-        vm.changes.add(op1.get_nm())
+        vm.changes.add_register(op1.get_nm())
 
 
 class Sra(Instruction):
@@ -363,7 +363,7 @@ class Sra(Instruction):
         signed_str = sign * op3.get_val()
         shifted_str = signed_str + bin_str_op2[: - op3.get_val()]
         op1.set_val(int(shifted_str, 2))
-        vm.changes.add(op1.get_nm())
+        vm.changes.add_register(op1.get_nm())
 
 
 class Srai(Instruction):
@@ -385,7 +385,7 @@ class Srai(Instruction):
         signed_str = sign * op3.get_val()
         shifted_str = signed_str + bin_str_op2[: - op3.get_val()]
         op1.set_val(int(shifted_str, 2))
-        vm.changes.add(op1.get_nm())
+        vm.changes.add_register(op1.get_nm())
 
 
 class Div(Instruction):
@@ -415,7 +415,7 @@ class Divu(Instruction):
         check_reg_only(self.name, ops)
         ops[0].set_val(check_overflow(opfunc.floordiv(
                        abs(ops[1].get_val()), abs(ops[2].get_val())), vm))
-        vm.changes.add(ops[0].get_nm())
+        vm.changes.add_register(ops[0].get_nm())
 
 
 class Rem(Instruction):
@@ -445,7 +445,7 @@ class Remu(Instruction):
         check_reg_only(self.name, ops)
         ops[0].set_val(check_overflow(opfunc.mod(
                        abs(ops[1].get_val()), abs(ops[2].get_val())), vm))
-        vm.changes.add(ops[0].get_nm())
+        vm.changes.add_register(ops[0].get_nm())
 
 
 class Lui(Instruction):
@@ -469,7 +469,7 @@ class Lui(Instruction):
         op1.set_val(check_overflow(opfunc.lshift(op2.get_val(),
                     12), vm))
         # print(op1.get_val())
-        vm.changes.add(op1.get_nm())
+        vm.changes.add_register(op1.get_nm())
 
 
 '''
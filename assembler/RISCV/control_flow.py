@@ -5,7 +5,7 @@ control_flow.py: control flow instructions,
 
 from assembler.errors import check_num_args, OutofBounds, InvalidArgument
 from assembler.tokens import Instruction, Register, IntegerTok
-from assembler.flowbreak import Jump
+from assembler.flowbreak import word_target
 from assembler.ops_check import get_one_op
 from .argument_check import check_immediate_two
 
@@ -31,7 +31,7 @@ class Jr(Instruction):
     """
     def fhook(self, ops, vm):
         target = get_one_op(self.get_nm(), ops)
-        raise Jump(str(target.get_val()))
+        return word_target(target.get_val())
 
 
 class Jal(Instruction):
@@ -56,8 +56,8 @@ class Jal(Instruction):
 
         op1.set_val(current_ip + 4)
         print(current_ip + 4)
-        vm.changes.add(op1.get_nm())
-        raise Jump(str(target))
+        vm.changes.add_register(op1.get_nm())
+        return word_target(target)
 
 # The original implementation of JAL was pretty off.
 # I've corrected it, but it needs to be tested some more.
@@ -82,8 +82,8 @@ class Jalr(Instruction):
 
         target = ops[1] + ops[2]
         ops[0].set_val(current_ip + 4)
-        vm.changes.add(ops[0].get_nm())
-        raise Jump(str(target))
+        vm.changes.add_register(ops[0].get_nm())
+        return word_target(target)
 # I need to find a better way to zero out the LSB. I think I
 # will be converting into binary form of string, slicing and
 # then converting back. It's the converting back that I have
@@ -8,9 +8,9 @@ from assembler.tokens import Instruction, MAX_INT
 
 
 def get_stack_operand(vm):
-    position = hex(vm.get_sp()).split('x')[-1].upper()
-    val_one = vm.stack[position]
-    vm.stack[position] = 0
+    position = vm.get_sp()
+    val_one = vm.stack.load(position)
+    vm.stack.store(position, 0)
     return val_one
 
 
@@ -29,8 +29,7 @@ def two_op_arith(ops, vm, instr, operator):
     """
     val_one, val_two = get_stack_operands(vm)
     # vm.dec_sp()
-    position = hex(vm.get_sp()).split('x')[-1].upper()
-    vm.stack[position] = operator(val_one, val_two)
+    vm.stack.store(vm.get_sp(), operator(val_one, val_two))
     vm.inc_sp()
 
 
@@ -137,7 +136,7 @@ class Div_U(Instruction):
             raise DivisionZero()
         result = opfunc.floordiv(abs(val_one), abs(val_two))
         check_overflow(result, vm)
-        vm.stack[hex(vm.get_sp()).split('x')[-1].upper()] = result
+        vm.stack.store(vm.get_sp(), result)
         vm.inc_sp()
 
 
@@ -177,7 +176,7 @@ class Rem_U(Instruction):
         val_one, val_two = get_stack_operands(vm)
         result = opfunc.mod(abs(val_one), abs(val_two))
         check_overflow(result, vm)
-        vm.stack[hex(vm.get_sp()).split('x')[-1].upper()] = result
+        vm.stack.store(vm.get_sp(), result)
         vm.inc_sp()
 
 
@@ -254,7 +253,7 @@ class Shl(Instruction):
         val_two = val_two % 32  # only for i32
         result = opfunc.lshift(val_one, val_two)
         check_overflow(result, vm)
-        vm.stack[hex(vm.get_sp()).split('x')[-1].upper()] = result
+        vm.stack.store(vm.get_sp(), result)
         vm.inc_sp()
 
 
@@ -276,7 +275,7 @@ class Shr_S(Instruction):
         val_one, val_two = get_stack_operands(vm)
         val_two = val_two % 32  # only for i32
         result = opfunc.rshift(val_one, val_two)
-        vm.stack[hex(vm.get_sp()).split('x')[-1].upper()] = result
+        vm.stack.store(vm.get_sp(), result)
         vm.inc_sp()
 
 
@@ -301,7 +300,7 @@ class Shr_U(Instruction):
         val_two_abs = val_two_abs % 32  # only for i32
         result = opfunc.rshift(val_one_abs, val_two_abs)
         check_overflow(result, vm)
-        vm.stack[hex(vm.get_sp()).split('x')[-1].upper()] = result
+        vm.stack.store(vm.get_sp(), result)
         vm.inc_sp()
 
 
@@ -331,7 +330,7 @@ class Rotl(Instruction):
             val_one_bin = "0" + val_one_bin
         val_two = val_two % 32  # only for i32
         result = val_one_bin[val_two:] + val_one_bin[:val_two]
-        vm.stack[hex(vm.get_sp()).split('x')[-1].upper()] = int(result, 2)
+        vm.stack.store(vm.get_sp(), int(result, 2))
         vm.inc_sp()
 
 
@@ -363,7 +362,7 @@ class Rotr(Instruction):
         first_part = val_one_bin[-val_two:]
         second_part = val_one_bin[: len(val_one_bin) - val_two]
         result = first_part + second_part
-        vm.stack[hex(vm.get_sp()).split('x')[-1].upper()] = int(result, 2)
+        vm.stack.store(vm.get_sp(), int(result, 2))
         vm.inc_sp()
 
 
@@ -390,7 +389,7 @@ class Clz(Instruction):
                 result += 1
             else:
                 break
-        vm.stack[hex(vm.get_sp()).split('x')[-1].upper()] = result
+        vm.stack.store(vm.get_sp(), result)
         vm.inc_sp()
 
 
@@ -417,7 +416,7 @@ class Ctz(Instruction):
                 result += 1
             else:
                 break
-        vm.stack[hex(vm.get_sp()).split('x')[-1].upper()] = result
+        vm.stack.store(vm.get_sp(), result)
         vm.inc_sp()
 
 
@@ -443,7 +442,7 @@ class Popcnt(Instruction):
         for i in val_one_bin:
             if i == "1":
                 result += 1
-        vm.stack[hex(vm.get_sp()).split('x')[-1].upper()] = result
+        vm.stack.store(vm.get_sp(), result)
         vm.inc_sp()
 
 
@@ -466,5 +465,5 @@ class Eqz(Instruction):
         result = False
         if val_one == 0:
             result = True
-        vm.stack[hex(vm.get_sp()).split('x')[-1].upper()] = result
+        vm.stack.store(vm.get_sp(), result)
         vm.inc_sp()
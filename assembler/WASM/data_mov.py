@@ -18,8 +18,8 @@ class Global_get(Instruction):
         check_num_args(self.get_nm(), ops, 1)
         if isinstance(ops[0], NewSymbol):
             if ops[0].get_nm() in vm.globals:
-                stack_loc = hex(vm.get_sp()).split('x')[-1].upper()
-                vm.stack[stack_loc] = vm.globals[ops[0].get_nm()]
+                stack_loc = vm.get_sp()
+                vm.stack.store(stack_loc, vm.globals[ops[0].get_nm()])
                 vm.inc_sp()
             else:
                 raise InvalidArgument(ops[0].get_nm())
@@ -44,10 +44,10 @@ class Global_set(Instruction):
         if isinstance(ops[0], NewSymbol):
             if ops[0].get_nm() in vm.globals:
                 vm.dec_sp()
-                stack_loc = hex(vm.get_sp()).split('x')[-1].upper()
-                vm.globals[ops[0].get_nm()] = vm.stack[stack_loc]
+                stack_loc = vm.get_sp()
+                vm.globals[ops[0].get_nm()] = vm.stack.load(stack_loc)
                 vm.inc_sp()
-                vm.changes.add(f'GLOBALVAR{ops[0].get_nm()}')
+                vm.changes.add_global(ops[0].get_nm())
             else:
                 raise InvalidArgument(ops[0].get_nm())
         else:
@@ -70,8 +70,8 @@ class Local_get(Instruction):
         check_num_args(self.get_nm(), ops, 1)
         if isinstance(ops[0], NewSymbol):
             if ops[0].get_nm() in vm.locals:
-                stack_loc = hex(vm.get_sp()).split('x')[-1].upper()
-                vm.stack[stack_loc] = vm.locals[ops[0].get_nm()]
+                stack_loc = vm.get_sp()
+                vm.stack.store(stack_loc, vm.locals[ops[0].get_nm()])
                 vm.inc_sp()
             else:
                 raise InvalidArgument(ops[0].get_nm())
@@ -96,10 +96,10 @@ class Local_set(Instruction):
         if isinstance(ops[0], NewSymbol):
             if ops[0].get_nm() in vm.locals:
                 vm.dec_sp()
-                stack_loc = hex(vm.get_sp()).split('x')[-1].upper()
-                vm.locals[ops[0].get_nm()] = vm.stack[stack_loc]
+                stack_loc = vm.get_sp()
+                vm.locals[ops[0].get_nm()] = vm.stack.load(stack_loc)
                 vm.inc_sp()
-                vm.changes.add(f'LOCALVAR{ops[0].get_nm()}')
+                vm.changes.add_local(ops[0].get_nm())
             else:
                 raise InvalidArgument(ops[0].get_nm())
         else:
@@ -122,7 +122,7 @@ class Store_global(Instruction):
         check_num_args(self.get_nm(), ops, 1)
         if isinstance(ops[0], NewSymbol):
             vm.globals[ops[0].get_nm()] = ops[0].get_val()
-            vm.changes.add(f'GLOBALVAR{ops[0].get_nm()}')
+            vm.changes.add_global(ops[0].get_nm())
         else:
             raise InvalidArgument(ops[0].get_nm())
 
@@ -143,7 +143,7 @@ class Store_local(Instruction):
         check_num_args(self.get_nm(), ops, 1)
         if isinstance(ops[0], NewSymbol):
             vm.locals[ops[0].get_nm()] = ops[0].get_val()
-            vm.changes.add(f'LOCALVAR{ops[0].get_nm()}')
+            vm.changes.add_local(ops[0].get_nm())
         else:
             raise InvalidArgument(ops[0].get_nm())
 
@@ -164,8 +164,8 @@ class Store_const(Instruction):
         check_num_args(self.get_nm(), ops, 1)
         if isinstance(ops[0], IntegerTok):
             try:
-                stack_loc = hex(vm.get_sp()).split('x')[-1].upper()
-                vm.stack[stack_loc] = ops[0].get_val()
+                stack_loc = vm.get_sp()
+                vm.stack.store(stack_loc, ops[0].get_val())
                 vm.inc_sp()
             except Exception:
                 raise InvalidArgument(ops[0].get_nm())
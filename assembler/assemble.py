@@ -2,17 +2,23 @@
 assemble.py
 Executes assembly code typed in.
 """
-from .flowbreak import FlowBreak
+import os
+from time import perf_counter
+
 from .errors import Error, InvalidInstruction, InvalidArgument, ExitProg
-from .parse import add_debug, parse
-from .lex import lex
-from .MIPS.control_flow import Jal, Jr
+from .parse import parse
+from .trace import add_debug
+from .lex import lex, lex_lines, find_labels
 from .MIPS.key_words import op_func_codes
 from .virtual_machine import MIPS_START_IP, RISC_START_IP, DIV_4_ASMS
+from .program_cache import CachedProgram, program_cache, program_key
+from .object_file import find_object, load_object, save_object, object_name
+from .object_file import OBJ_EXT
 
 # from .RISCV.control_flow import  Jr, Jal
 
 MAX_INSTRUCTIONS = 1000  # prevent infinite loops!
+CLOCK_CHECK_INTERVAL = 256  # instructions between wall-clock checks
 
 JMP_STR = "A jump instruction."
 
@@ -24,26 +30,48 @@ INSTR_MIPS = 1
 OPS_MIPS = 2
 
 
-def dump_flags(vm):
-    for flag, val in vm.flags.items():
-        add_debug("Flag = " + flag + "; val = " + str(val), vm)
+class RunBudget:
+    """
+    Limits for a single run of the code, and what the run used.
+    Pass one to assemble() to allow longer runs than the default,
+    or to put a wall-clock deadline on them; afterwards it holds
+    the number of instructions executed and the time taken.
+    """
+    def __init__(self, max_instrs=MAX_INSTRUCTIONS, max_secs=None):
+        self.max_instrs = max_instrs
+        self.max_secs = max_secs
+        self.instrs = 0
+        self.elapsed = 0.0
+        self.start_time = 0.0
 
+    def start(self):
+        """
+        Starts the clock.
 
-def jump_to_label(label, source, vm, jal=False):
-    if label in vm.labels:
-        ip = vm.labels[label]  # set i to line num of label
-        vm.set_ip(ip + vm.start_ip)
-        vm.next_stack_change = label
-        return (True, source, "")
-    else:
-        try:
-            ip = int(label)
-            if jal:
-                ip = ip >> 2
-            vm.set_ip(ip)
-            return (True, source, "")
-        except Exception:
-            return (False, source, "Invalid label: " + label)
+        Returns:
+            The deadline on the perf_counter() clock, or None if
+            there is no wall-clock limit.
+        """
+        self.instrs = 0
+        self.elapsed = 0.0
+        self.start_time = perf_counter()
+        if self.max_secs is None:
+            return None
+        return self.start_time + self.max_secs
+
+    def stop(self, instrs):
+        self.instrs = instrs
+        self.elapsed = perf_counter() - self.start_time
+
+    def instrs_per_sec(self):
+        if self.elapsed <= 0:
+            return 0.0
+        return self.instrs / self.elapsed
+
+    def __str__(self):
+        return ("Executed " + str(self.instrs) + " instructions in "
+                + "%.6f" % self.elapsed + " seconds ("
+                + "%.0f" % self.instrs_per_sec() + " instructions/sec)")
 
 
 def create_bit_negative(value, bits):
@@ -231,99 +259,269 @@ def create_bit_instr(instr_lst):
             return create_bit_j_format(instr_lst, op_func)
 
 
-def exec(tok_lines, vm, last_instr):
+def decode(tok_lines, vm):
     """
-        Executes a single instruction at location reg[EIP] in tok_lines.
+    Pre-decodes the parsed instructions, so that executing a step
+    is a single index into the returned list.
+
+    Args:
+        tok_lines: List of parsed instructions and their source code
+        vm: Virtual machine
+
+    Returns:
+        A list of (handler, ops, source, pc) tuples.
+        pc is None for flavors that don't carry a PC on each line.
+    """
+    decoded = []
+    if vm.flavor in DIV_4_ASMS:
+        for (curr_instr, source) in tok_lines:
+            decoded.append((curr_instr[INSTR_MIPS].fhook,
+                            curr_instr[OPS_MIPS:],
+                            source, curr_instr[PC_MIPS].get_val()))
+    else:
+        for (curr_instr, source) in tok_lines:
+            decoded.append((curr_instr[INSTR_INTEL].fhook,
+                            curr_instr[OPS_INTEL:],
+                            source, None))
+    return decoded
+
+
+def exec(decoded, vm, last_instr):
+    """
+        Executes a single instruction at location reg[EIP] in decoded.
         Returns:
             success: was instruction valid?
             last_instr: any last_instr
             err_msg: if no success, what went wrong?
     """
     try:
-        ip = vm.get_ip() - vm.start_ip
-        curr_instr = None
+        ip = vm.get_ip()
         source = None
         last_instr = None
-        if ip // vm.get_ip_div() >= len(tok_lines):
+        index = (ip - vm.start_ip) // vm.ip_div
+        if index >= len(decoded):
             raise InvalidInstruction("Past end of code.")
-        (curr_instr, source) = tok_lines[ip // vm.get_ip_div()]
-        if vm.flavor in DIV_4_ASMS:
-            if vm.get_ip() != curr_instr[PC_MIPS].get_val():
-                raise InvalidArgument(hex(curr_instr[PC_MIPS].get_val()))
-            vm.inc_ip()
-            last_instr = curr_instr[INSTR_MIPS].f(curr_instr[OPS_MIPS:], vm)
-
-    # if flavor == "riscv":
-    #     if ip // 4 >= len(tok_lines):
-    #         raise InvalidInstruction("Past end of code.")
-    #     (curr_instr, source) = tok_lines[ip // 4]
-    #     if vm.get_ip() != curr_instr[PC_RISCV].get_val():
-    #         raise InvalidArgument(hex(curr_instr[PC_RISCV].get_val()))
-    #     vm.inc_ip()
-    #     last_instr = curr_instr[INSTR_RISCV].f(curr_instr[OPS_RISCV:], vm)
-
-        else:
-            vm.inc_ip()
-            last_instr = curr_instr[INSTR_INTEL].f(curr_instr[OPS_INTEL:], vm)
-        if vm.flavor != 'wasm':
-            for label in vm.labels:
-                if vm.get_ip() == vm.labels[label]:
-                    vm.next_stack_change = label
+        (handler, ops, source, pc) = decoded[index]
+        if pc is not None and ip != pc:
+            raise InvalidArgument(hex(pc))
+        vm.inc_ip()
+        # a taken jump hands back the new instruction pointer:
+        target = handler(ops, vm)
+        if isinstance(target, int):
+            vm.set_ip(target)
+        elif vm.flavor != 'wasm':
+            label = vm.ip_labels.get(vm.get_ip())
+            if label is not None:
+                vm.next_stack_change = label
         return (True, source, "")
 
-    except FlowBreak as brk:
-        # we have hit one of the JUMP instructions: jump to that line.
-        add_debug("In FlowBreak", vm)
-        dump_flags(vm)
-        if isinstance(curr_instr[INSTR_MIPS], Jal) and vm.flavor != 'riscv':
-            vm.registers["R31"] = vm.get_ip()
-        if isinstance(curr_instr[INSTR_MIPS], Jr) and vm.flavor != 'riscv':
-            return jump_to_label(brk.label, source, vm)
-        return jump_to_label(brk.label, source, vm, True)
     except ExitProg:
         raise ExitProg(source)
     except Error as err:
         return (False, last_instr, err.msg)
 
 
-def step_code(tok_lines, vm, error, last_instr, bit_code):
+def step_code(decoded, vm, error, last_instr, bit_code, budget):
     if vm.get_ip() == 0:
         vm.set_ip(vm.get_start_ip())
     ip = (vm.get_ip() - vm.get_start_ip()) // vm.get_ip_div()
 
-    if ip < len(tok_lines):
-        (success, last_instr, error) = exec(tok_lines, vm,
-                                            last_instr)
+    budget.start()
+    if ip < len(decoded):
+        try:
+            (success, last_instr, error) = exec(decoded, vm, last_instr)
+        finally:
+            budget.stop(1)
     else:
         last_instr = "Reached end of executable code."
+        budget.stop(0)
         # rewind:
         vm.set_ip(vm.start_ip)
 
     return (last_instr, error, bit_code)
 
 
-def run_code(tok_lines, vm, error, last_instr, bit_code):
+def run_code(decoded, vm, error, last_instr, bit_code, budget):
     count = 0
+    out_of_time = False
     add_debug("Setting ip to 0", vm)
-    vm.set_ip(vm.get_start_ip())   # instruction pointer reset for 'run'
-
-    while ((vm.get_ip() - vm.get_start_ip()) // vm.get_ip_div()
-           < len(tok_lines)
-           and count < MAX_INSTRUCTIONS):
-        (success, last_instr, error) = exec(tok_lines, vm,
-                                            last_instr)
-        if not success:
-            break
-        count += 1
-
-    if count >= MAX_INSTRUCTIONS:
+    start_ip = vm.get_start_ip()
+    ip_div = vm.get_ip_div()
+    num_instrs = len(decoded)
+    max_instrs = budget.max_instrs
+    vm.set_ip(start_ip)   # instruction pointer reset for 'run'
+
+    deadline = budget.start()
+    try:
+        while ((vm.get_ip() - start_ip) // ip_div < num_instrs
+               and count < max_instrs):
+            (success, last_instr, error) = exec(decoded, vm, last_instr)
+            if not success:
+                break
+            count += 1
+            # reading the clock costs more than an instruction does:
+            if (deadline is not None
+                    and count % CLOCK_CHECK_INTERVAL == 0
+                    and perf_counter() > deadline):
+                out_of_time = True
+                break
+    finally:
+        budget.stop(count)
+        add_debug(str(budget), vm)
+
+    if count >= max_instrs:
         error = ("Possible infinite loop detected: "
-                 + "instructions run has exceeded " + str(MAX_INSTRUCTIONS))
+                 + "instructions run has exceeded " + str(max_instrs))
+    elif out_of_time:
+        error = ("Possible infinite loop detected: "
+                 + "run time has exceeded " + str(budget.max_secs)
+                 + " seconds")
 
     return (last_instr, error, bit_code)
 
 
-def assemble(code, vm, step=False, web=True):
+def load_program(code, vm, web, obj_dir=None):
+    """
+    Assembles code and loads it into vm. Assembled programs are
+    cached, so code we have seen before is only loaded.
+
+    Args:
+        code: code to assemble
+        vm: Virtual machine
+        web: Boolean indicating whether source is from the website
+        obj_dir: Directory of object files to look in for the
+                 program before assembling it
+
+    Returns:
+        A CachedProgram
+    """
+    key = program_key(code, vm.flavor, vm.base, web)
+    cached = program_cache.get(key, vm)
+    if cached is None:
+        program = None
+        if obj_dir is not None:
+            program = find_object(key, vm, obj_dir)
+        if program is None:
+            labels = {}
+            tok_lines = lex(code, vm, labels)
+            program = parse(tok_lines, vm, web, labels)
+        cached = make_cached(program, vm)
+        program_cache.put(key, cached)
+    cached.program.load(vm)
+    return cached
+
+
+def make_cached(program, vm):
+    """
+    Works out what we need from program before running it.
+
+    Args:
+        program: Program
+        vm: Virtual machine
+
+    Returns:
+        A CachedProgram
+    """
+    bit_code = ''
+    if vm.flavor == "mips_asm" or vm.flavor == "mips_mml":
+        for curr_instr, source in program.instrs:
+            bit_code += create_bit_instr(curr_instr)
+    return CachedProgram(program, bit_code)
+
+
+def read_lines(file_nm):
+    """
+    Yields the lines of file file_nm, reading it as we go.
+    """
+    with open(file_nm, "r") as asm_file:
+        yield from asm_file
+
+
+def parse_file(file_nm, vm, web=True):
+    """
+    Assembles the code in file file_nm.
+    The file is streamed through the lexer and parser a line at a time,
+    so we never hold more than the assembled program in memory.
+    It is read twice: first to find the labels, as code can jump
+    forward, then to parse it.
+
+    Args:
+        file_nm: Path of the file of code to assemble
+        vm: Virtual machine
+        web: Boolean indicating whether source is from the website
+
+    Returns:
+        A Program
+    """
+    labels = find_labels(read_lines(file_nm), vm)
+    return parse(lex_lines(read_lines(file_nm), vm, labels),
+                 vm, web, labels)
+
+
+def load_file(file_nm, vm, web=True):
+    """
+    Assembles the code in file file_nm and loads it into vm.
+    Object files are loaded as they are.
+
+    Args:
+        file_nm: Path of the file of code to assemble
+        vm: Virtual machine
+        web: Boolean indicating whether source is from the website
+
+    Returns:
+        A CachedProgram
+    """
+    if file_nm.endswith(OBJ_EXT):
+        program = load_object(file_nm, vm)
+    else:
+        program = parse_file(file_nm, vm, web)
+    cached = make_cached(program, vm)
+    program.load(vm)
+    return cached
+
+
+def compile_file(file_nm, vm, obj_nm=None, obj_dir=None, web=True):
+    """
+    Assembles the code in file file_nm and saves it to an object file,
+    so it can be loaded later without lexing and parsing it.
+
+    Args:
+        file_nm: Path of the file of code to assemble
+        vm: Virtual machine
+        obj_nm: Path of the object file; by default, file_nm
+                with its extension changed
+        obj_dir: If given, the object file goes in this directory, named
+                 so that load_program() finds it for the same code
+        web: Boolean indicating whether source is from the website
+
+    Returns:
+        The path of the object file
+    """
+    program = parse_file(file_nm, vm, web)
+    with open(file_nm, "r") as asm_file:
+        key = program_key(asm_file.read(), vm.flavor, vm.base, web)
+    if obj_dir is not None:
+        obj_nm = object_name(key, obj_dir)
+    elif obj_nm is None:
+        obj_nm = os.path.splitext(file_nm)[0] + OBJ_EXT
+    save_object(program, obj_nm, key)
+    return obj_nm
+
+
+def update_stack_change(vm):
+    """
+    Moves the stack change the last run left pending
+    onto the call stack we show.
+    """
+    if vm.flavor != 'wasm' and vm.next_stack_change != "":
+        vm.stack_change = vm.next_stack_change
+        vm.next_stack_change = ""
+        if len(vm.c_stack) != 0 and not isinstance(vm.c_stack[-1], int):
+            vm.c_stack.pop()
+        vm.c_stack.append(vm.stack_change)
+
+
+def assemble(code, vm, step=False, web=True, budget=None, obj_dir=None):
     """
         Assembles and runs code.
         Args:
@@ -334,42 +532,83 @@ def assemble(code, vm, step=False, web=True):
                 memory: current memory values.
                 flags: current values of flags.
             step: are we stepping through code or running continuously?
+            budget: a RunBudget limiting the run; it also receives
+                the instruction count and time taken.
+            obj_dir: a directory of object files; code compiled there
+                is loaded rather than assembled.
         Returns:
             next
             Error, if any.
     """
-    last_instr = ''
-    error = ''
-    bit_code = ''
-    count = 0
-    if vm.flavor != 'wasm' and vm.next_stack_change != "":
-        vm.stack_change = vm.next_stack_change
-        vm.next_stack_change = ""
-        if len(vm.c_stack) != 0 and not isinstance(vm.c_stack[-1], int):
-            vm.c_stack.pop()
-        vm.c_stack.append(vm.stack_change)
+    update_stack_change(vm)
 
     if code is None or len(code) == 0:
         return ("", "Must submit code to run.", "")
 
-    tok_lines = None
-
     # break the code into tokens:
     try:
-        tok_lines = lex(code, vm)
-        tok_lines = parse(tok_lines, vm, web)
+        cached = load_program(code, vm, web, obj_dir)
 
     except Error as err:
-        return (last_instr, err.msg, bit_code)
+        return ('', err.msg, '')
+
+    return run_program(cached, vm, step, budget)
+
+
+def assemble_file(file_nm, vm, step=False, web=True, budget=None):
+    """
+        Assembles and runs the code in a file, streaming it through
+        the lexer and parser rather than reading it in whole.
+        Object files are run without assembling them.
+        Args:
+            file_nm: path of the file of code to assemble,
+                or of an object file.
+            vm: Our virtual machine.
+            step: are we stepping through code or running continuously?
+            budget: a RunBudget limiting the run; it also receives
+                the instruction count and time taken.
+        Returns:
+            next
+            Error, if any.
+    """
+    update_stack_change(vm)
 
     try:
-        if vm.flavor == "mips_asm" or vm.flavor == "mips_mml":
-            for curr_instr, source in tok_lines:
-                bit_code += create_bit_instr(curr_instr)
+        cached = load_file(file_nm, vm, web)
+
+    except Error as err:
+        return ('', err.msg, '')
+
+    return run_program(cached, vm, step, budget)
+
+
+def run_program(cached, vm, step=False, budget=None):
+    """
+        Runs a program that has been loaded into vm.
+        Args:
+            cached: CachedProgram to run.
+            vm: Our virtual machine.
+            step: are we stepping through code or running continuously?
+            budget: a RunBudget limiting the run; it also receives
+                the instruction count and time taken.
+        Returns:
+            next
+            Error, if any.
+    """
+    last_instr = ''
+    error = ''
+    bit_code = ''
+    if budget is None:
+        budget = RunBudget()
+    try:
+        bit_code = cached.bit_code
+        decoded = cached.get_decoded(vm, decode)
         if step:
-            return step_code(tok_lines, vm, error, last_instr, bit_code)
+            return step_code(decoded, vm, error, last_instr, bit_code,
+                             budget)
         else:  # step through code
-            return run_code(tok_lines, vm, error, last_instr, bit_code)
+            return run_code(decoded, vm, error, last_instr, bit_code,
+                            budget)
 
     except ExitProg as ep:
         last_instr = ep.msg.split(":")[0] + ": Exiting program"
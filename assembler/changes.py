@@ -0,0 +1,115 @@
+"""
+changes.py: the journal of what the last instructions changed,
+which the website and the kernels highlight.
+"""
+
+from .memory import hex_addr
+
+REGISTER = 0
+MEMORY = 1
+FLAG = 2
+GLOBAL = 3
+LOCAL = 4
+
+# how changes used to be written, as strings; registers had no prefix:
+PREFIXES = (
+    (MEMORY, "MEM"),
+    (FLAG, "FLAG"),
+    (GLOBAL, "GLOBALVAR"),
+    (LOCAL, "LOCALVAR"),
+)
+PREFIX_OF = dict(PREFIXES)
+
+
+def parse_change(name):
+    """
+    Converts a change written as a string, such as 'EAX', 'MEM1F'
+    or 'FLAGZF', to its (kind, key) entry.
+    """
+    if isinstance(name, str):
+        for kind, prefix in PREFIXES:
+            if name.startswith(prefix):
+                key = name[len(prefix):]
+                if kind == MEMORY:
+                    try:
+                        key = int(key, 16)
+                    except ValueError:
+                        pass
+                return (kind, key)
+    return (REGISTER, name)
+
+
+def change_name(entry):
+    """
+    Converts a (kind, key) entry to the string the website uses.
+    """
+    (kind, key) = entry
+    if kind == REGISTER:
+        return key
+    if kind == MEMORY and isinstance(key, int):
+        key = hex_addr(key)
+    return PREFIX_OF[kind] + str(key)
+
+
+class ChangeJournal:
+    """
+    The registers, memory cells, flags and variables changed since the
+    journal was last cleared: usually, by the last step.
+    Each change is kept once, as a (kind, key) entry, in the order
+    first made; memory cells are keyed by their integer address.
+
+    Instructions record changes with add_register(), add_memory(),
+    add_flag(), add_global() and add_local(). The journal also works
+    as the set of strings changes used to be ('EAX', 'MEM1F',
+    'FLAGZF'...), which is how the templates look at it.
+    """
+    def __init__(self):
+        self.entries = {}
+
+    def add_register(self, name):
+        self.entries[(REGISTER, name)] = None
+
+    def add_memory(self, addr):
+        self.entries[(MEMORY, addr)] = None
+
+    def add_flag(self, name):
+        self.entries[(FLAG, name)] = None
+
+    def add_global(self, name):
+        self.entries[(GLOBAL, name)] = None
+
+    def add_local(self, name):
+        self.entries[(LOCAL, name)] = None
+
+    def add(self, name):
+        """
+        Records a change written as a string.
+        """
+        self.entries[parse_change(name)] = None
+
+    def clear(self):
+        self.entries = {}
+
+    def delta(self):
+        """
+        Returns the changes grouped by kind: a dictionary of
+        kind: list of keys, in the order the changes were made.
+        """
+        groups = {kind: [] for kind in (REGISTER, MEMORY, FLAG,
+                                        GLOBAL, LOCAL)}
+        for (kind, key) in self.entries:
+            groups[kind].append(key)
+        return groups
+
+    def __contains__(self, name):
+        return parse_change(name) in self.entries
+
+    def __iter__(self):
+        for entry in self.entries:
+            yield change_name(entry)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        return str(set(self))
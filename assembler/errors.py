@@ -18,6 +18,7 @@ INVALID_CONSTANT_VAL = "Invalid constant value: "
 INVALID_SECTION = "Invalid section: "
 INVALID_TOKEN = "Invalid argument: "
 INVALID_PC = "Invalid PC: "
+INVALID_LABEL = "Invalid label: "
 LABEL_NOT_SETTABLE = "Label values can't be reset."
 NOT_SETTABLE = "This operand type can't have its value set: "
 PROGRAM_EXIT = "Program exit"
@@ -45,6 +46,7 @@ NOT_CORRECT_BITS = "Instruction expected integer of max length 20 bits"
 TOO_PRECISE = "Floating point number has too many decimal places: "
 INVALID_STRING = "The String Provided is Invalid"
 STACK_FULL = "Cannot push another element, stack is full"
+INVALID_OBJ_FILE = "Invalid object file: "
 
 INT_MAX = (2**31)-1
 INT_MIN = -(2**31)
@@ -123,6 +125,11 @@ class UnknownLabel(Error):
         self.msg = UNKNOWN_LABEL + offender
 
 
+class InvalidLabel(Error):
+    def __init__(self, offender):
+        self.msg = INVALID_LABEL + offender
+
+
 class UnknownName(Error):
     def __init__(self, offender):
         self.msg = UNKNOWN_NM + offender
@@ -256,6 +263,11 @@ class StackFull(Error):
         self.msg = STACK_FULL
 
 
+class InvalidObjFile(Error):
+    def __init__(self, offender):
+        self.msg = INVALID_OBJ_FILE + offender
+
+
 def check_num_args(instr, ops, correct_num, type_ins=0):
     """
     See if we have the proper number of arguments.
@@ -0,0 +1,135 @@
+"""
+flags.py: the condition flags of our virtual machines.
+"""
+
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from .tokens import BITS, MAX_INT, MIN_INT
+
+WORD_MASK = (1 << BITS) - 1
+
+
+def overflows(val):
+    return int(val > MAX_INT or val < MIN_INT)
+
+
+def add_flags(a, b, res):
+    """
+    Carry and overflow of a 32-bit addition.
+    """
+    return (('CF', int((a & WORD_MASK) + (b & WORD_MASK) > WORD_MASK)),
+            ('OF', overflows(res)))
+
+
+def sub_flags(a, b, res):
+    """
+    Borrow and overflow of a 32-bit subtraction.
+    """
+    return (('CF', int((a & WORD_MASK) < (b & WORD_MASK))),
+            ('OF', overflows(res)))
+
+
+def cmp_flags(a, b, res):
+    """
+    The flags set by comparing a and b: a subtraction whose
+    result is thrown away.
+    """
+    wrapped = res & WORD_MASK
+    return (sub_flags(a, b, res)
+            + (('SF', wrapped >> (BITS - 1)), ('ZF', int(wrapped == 0))))
+
+
+def carry_flags(a, b, res):
+    """
+    Carry out of the other arithmetic and logic instructions.
+    """
+    return (('CF', int(res > MAX_INT)),)
+
+
+# the flags each of the functions above sets:
+flags_set = {
+    add_flags: {'CF', 'OF'},
+    sub_flags: {'CF', 'OF'},
+    cmp_flags: {'CF', 'OF', 'SF', 'ZF'},
+    carry_flags: {'CF'},
+}
+
+
+class LazyFlags(MutableMapping):
+    """
+    The Intel flags, worked out only when they are looked at.
+    An instruction that sets flags records which of the functions
+    above works them out, along with its operands and result;
+    as most flags are set again before anything reads them,
+    the next instruction usually just replaces the record; when it
+    sets fewer flags, the flags of the record it replaces are worked
+    out then.
+
+    Reading, setting or iterating over the flags first works out
+    the flags of the last instruction recorded; those flags go into
+    the machine's changes then.
+    """
+    def __init__(self, names, changes):
+        """
+        Args:
+            names: Names of the flags, in the order we show them
+            changes: ChangeJournal of the machine
+        """
+        self.values = OrderedDict((name, 0) for name in names)
+        self.changes = changes
+        self.pending = None
+
+    def record(self, flag_func, a, b, res):
+        """
+        Notes that the last instruction set the flags that
+        flag_func(a, b, res) works out.
+        The flags of the instruction recorded before are worked out
+        first, unless flag_func sets them all again.
+        """
+        if self.pending is not None:
+            pending_set = flags_set.get(self.pending[0])
+            if (pending_set is None
+                    or not pending_set <= flags_set.get(flag_func, set())):
+                self.settle()
+        self.pending = (flag_func, a, b, res)
+
+    def settle(self):
+        """
+        Works out the flags of the instruction recorded, if any.
+        """
+        if self.pending is not None:
+            (flag_func, a, b, res) = self.pending
+            self.pending = None
+            for name, value in flag_func(a, b, res):
+                self.values[name] = value
+                self.changes.add_flag(name)
+
+    def __getitem__(self, name):
+        if self.pending is not None:
+            self.settle()
+        return self.values[name]
+
+    def __setitem__(self, name, value):
+        if name not in self.values:
+            raise KeyError(name)
+        if self.pending is not None:
+            self.settle()
+        self.values[name] = value
+
+    def __delitem__(self, name):
+        raise KeyError(name)
+
+    def __contains__(self, name):
+        return name in self.values
+
+    def __iter__(self):
+        if self.pending is not None:
+            self.settle()
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __str__(self):
+        return str(dict(self.items()))
@@ -1,14 +1,40 @@
-class FlowBreak(Exception):
+"""
+flowbreak.py: resolves the targets of control flow instructions.
+
+A taken jump returns the new instruction pointer from its fhook(),
+and exec() sets it: no exception is raised to break the flow.
+Labels are bound to their line numbers at parse time.
+"""
+from .errors import InvalidLabel
+from .tokens import Label
+
+
+def label_target(target, vm):
     """
-    Base class for all of our flow break exceptions.
+    Returns the instruction pointer a label operand points at.
+
+    Args:
+        target: Operand of the jump
+        vm: Virtual machine
+
+    Returns:
+        Instruction pointer of the labelled line
     """
-    def __init__(self, label):
-        super().__init__("Flow break")
-        self.label = label
-        self.msg = "Unknown control flow exception."
+    if not isinstance(target, Label):
+        raise InvalidLabel(target.get_nm())
+    vm.next_stack_change = target.get_nm()
+    return target.get_val() + vm.start_ip
 
 
-class Jump(FlowBreak):
-    def __init__(self, label):
-        super().__init__(label)
-        self.msg = "Jump to " + label
+def word_target(addr):
+    """
+    Returns the instruction pointer for a numeric jump target,
+    which is given to us as a byte address.
+
+    Args:
+        addr: Target address
+
+    Returns:
+        Instruction pointer
+    """
+    return int(addr) >> 2
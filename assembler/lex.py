@@ -3,11 +3,15 @@ lex.py: performs lexical analysis
 """
 
 import re
+import threading
+from types import MappingProxyType
+from weakref import WeakKeyDictionary
 from .errors import IntOutOfRng, InvalidArgument
-from .tokens import Register, NewSymbol, Section
+from .tokens import Register, NewSymbol, Section, make_register
 from .tokens import QuestionTok, PlusTok, MinusTok
-from .tokens import StringTok, IntegerTok, OpenBracket, CloseBracket
+from .tokens import StringTok, OpenBracket, CloseBracket, int_tok
 from .tokens import Comma, OpenParen, CloseParen, FloatTok
+from .line_cache import LexedLine, get_line_caches
 
 # for floating point to binary and back
 import struct
@@ -90,9 +94,9 @@ def generate_reg_dict(vm):
     if vm.flavor != 'wasm':
         for reg in vm.registers:
             if vm.flavor == "att":
-                registers["%" + reg] = Register(reg, vm)
+                registers["%" + reg] = make_register(reg, vm)
             else:
-                registers[reg] = Register(reg, vm)
+                registers[reg] = make_register(reg, vm)
     return registers
 
 
@@ -118,103 +122,144 @@ def generate_float_stack_dict(vm):
     return registers
 
 
-def make_language_keys(vm):
+def make_flavor_keys(flavor):
     """
-    Creates a dictionary of key terms
+    Creates a dictionary of the key terms of a flavor
+    that are the same on every machine: punctuation and instructions.
 
     Args:
-        vm: Virtual machine
+        flavor: Assembly language
 
     Returns:
         A dictionary of key terms with associated tokens
     """
-    language_keys = {}
-    language_keys.update(keywords_to_tokens)
-
-    language_keys.update(generate_reg_dict(vm))
-    if vm.flavor == "mips_asm" or vm.flavor == "mips_mml":
+    flavor_keys = {}
+    flavor_keys.update(keywords_to_tokens)
+    if flavor == "mips_asm" or flavor == "mips_mml":
         from .MIPS.key_words import key_words
-        language_keys.update(key_words)
-        return language_keys
-    elif vm.flavor == "riscv":
+        flavor_keys.update(key_words)
+    elif flavor == "riscv":
         from .RISCV.key_words import key_words
-        language_keys.update(key_words)
-    elif vm.flavor == 'wasm':
+        flavor_keys.update(key_words)
+    elif flavor == 'wasm':
         from .WASM.key_words import key_words
-        language_keys.update(key_words)
+        flavor_keys.update(key_words)
     else:
         from .Intel.key_words import instructions
-        language_keys.update(instructions)
-        if vm.flavor == "intel":
-            # language_keys.update(generate_float_stack_dict(vm, flavor))
+        flavor_keys.update(instructions)
+        if flavor == "intel":
+            # flavor_keys.update(generate_float_stack_dict(vm, flavor))
             from .Intel.key_words import intel_key_words
-            language_keys.update(intel_key_words)
+            flavor_keys.update(intel_key_words)
         else:
             from .Intel.key_words import att_key_words
-            language_keys.update(att_key_words)
+            flavor_keys.update(att_key_words)
+    return flavor_keys
+
+
+def make_language_keys(vm):
+    """
+    Creates a dictionary of key terms
+
+    Args:
+        vm: Virtual machine
+
+    Returns:
+        A dictionary of key terms with associated tokens
+    """
+    flavor_keys = flavor_tables.get(vm.flavor)
+    if flavor_keys is None:
+        flavor_keys = make_flavor_keys(vm.flavor)
+        flavor_tables[vm.flavor] = flavor_keys
+    language_keys = {}
+    language_keys.update(generate_reg_dict(vm))
+    language_keys.update(flavor_keys)
     return language_keys
 
 
-def clean_list(lst):
+# key term tables are built the first time they are needed, then shared:
+# instructions by flavor, and registers (whose tokens refer to a machine)
+# by machine and flavor. The threads serving the website share them,
+# hence the lock.
+flavor_tables = {}
+machine_keys = WeakKeyDictionary()
+keys_lock = threading.Lock()
+
+
+def get_language_keys(vm):
     """
-    Removes empty strings from a list of words
+    Returns the (read-only) dictionary of key terms for vm,
+    building it if this is the first time we need it.
 
     Args:
-        lst: List of words
+        vm: Virtual machine
+
+    Returns:
+        A dictionary of key terms with associated tokens
+    """
+    with keys_lock:
+        vm_tables = machine_keys.setdefault(vm, {})
+        language_keys = vm_tables.get(vm.flavor)
+        if language_keys is None:
+            language_keys = MappingProxyType(make_language_keys(vm))
+            vm_tables[vm.flavor] = language_keys
+        return language_keys
+
+
+def make_word_re(separators):
+    """
+    Compiles the regular expression that finds the words of a line:
+    each separator character is a word on its own, and so is each run
+    of other characters between blanks and separators.
+
+    Args:
+        separators: Set of separator characters
 
     Returns:
-        Cleaned list of words
+        A compiled regular expression
     """
-    while "" in lst:
-        lst.remove("")
+    seps = re.escape("".join(sorted(separators)))
+    return re.compile("[" + seps + "]|[^ \t\r\n" + seps + "]+")
+
+
+word_re = make_word_re(SEPARATORS)
+# AT&T marks immediate operands with '$':
+att_word_re = make_word_re(SEPARATORS | {'$'})
 
 
 def split_code(code, vm):
     """
-    Splits code on regular expressions and on separators
+    Splits code on blanks and on separators
 
     Args:
         code: Line of code
+        vm: Virtual machine
 
     Returns:
         A list of words
     """
+    if vm.flavor == "att":
+        return att_word_re.findall(code)
+    return word_re.findall(code)
 
-    # split on regular expressions
-    words = re.split("[ \t\r\n]+", code)
-    index = 0
-
-    # split on separator characters, such as commas
-    while index < len(words):
-        splitter = ""
-        for character in words[index]:
-            # determine the splitter
-            if character in SEPARATORS and words[index] != character:
-                splitter = character
-                break
-            # splitter specifically for AT&T
-            elif (vm.flavor == "att" and
-                  words[index] != "$" and
-                  character == "$"):
-                splitter = "$"
-                break
-        # split if splitter is found
-        if splitter != "":
-            split_location = words[index].find(splitter)
-            temp_words = [words[index][:split_location]]
-            temp_words.append(splitter)
-            temp_words.append(words[index][split_location + 1:])
-            words = words[:index] + temp_words + words[index + 1:]
-        else:
-            index += 1
 
-    # remove all empty strings from list that were made from splitting
-    # if splitter was first or last character
-    clean_list(words)
-    return words
+def label_loc(i, vm):
+    """
+    Returns where a label on line number i points.
+
+    Args:
+        i: Line number of code
+        vm: Virtual machine
+
+    Returns:
+        The label's line number, or address for MIPS and RISC-V
+    """
+    if vm.flavor == "mips_asm" or vm.flavor == "riscv":
+        return i * 4
+    return i
 
 
-def sep_line(code, i, data_sec, vm, language_keys):
+def sep_line(code, i, data_sec, vm, language_keys, labels):
     """
     Returns a list of tokens created
 
@@ -226,6 +271,7 @@ def sep_line(code, i, data_sec, vm, language_keys):
                   Needed to differentiate between label and symbol
         vm: Virtual machine
         key_words: Dictionary of key words for the flavor
+        labels: Dictionary that receives the labels defined on the line
 
     Returns:
         Tuple of the lexical analysis of the line
@@ -252,16 +298,10 @@ def sep_line(code, i, data_sec, vm, language_keys):
             analysis.append(StringTok(word))
         # label / symbol:
         elif re.match(label_match, word) is not None:
-            if vm.flavor == "intel":
-                vm.labels[word[:-1]] = i
+            if vm.flavor != "intel" and data_sec:
+                analysis.append(NewSymbol(word[:-1], vm))
             else:
-                if data_sec:
-                    analysis.append(NewSymbol(word[:-1], vm))
-                else:
-                    if vm.flavor == "mips_asm" or vm.flavor == "riscv":
-                        vm.labels[word[:-1]] = i * 4
-                    else:
-                        vm.labels[word[:-1]] = i
+                labels[word[:-1]] = label_loc(i, vm)
         elif re.match(sym_match, word) is not None:
             analysis.append(NewSymbol(word, vm))
         # Floating Points
@@ -288,9 +328,9 @@ def sep_line(code, i, data_sec, vm, language_keys):
             if vm.base == "dec":
                 try:
                     if vm.flavor == "att":
-                        analysis.append(IntegerTok(int(word), False))
+                        analysis.append(int_tok(int(word), False))
                     else:
-                        analysis.append(IntegerTok(int(word)))
+                        analysis.append(int_tok(int(word)))
                 except IntOutOfRng:
                     raise IntOutOfRng(word)
                 except Exception:
@@ -298,9 +338,9 @@ def sep_line(code, i, data_sec, vm, language_keys):
             else:
                 try:
                     if vm.flavor == "att":
-                        analysis.append(IntegerTok(int(word, 16), False))
+                        analysis.append(int_tok(int(word, 16), False))
                     else:
-                        analysis.append(IntegerTok(int(word, 16)))
+                        analysis.append(int_tok(int(word, 16)))
                 except IntOutOfRng:
                     raise IntOutOfRng(word)
                 except Exception:
@@ -336,7 +376,7 @@ def sep_line_mml(code, i, vm, language_keys):
     # Integers
         else:
             try:
-                analysis.append(IntegerTok(int(word, 16)))
+                analysis.append(int_tok(int(word, 16)))
             except IntOutOfRng:
                 raise IntOutOfRng(word)
             except Exception:
@@ -375,7 +415,7 @@ def sep_line_wasm(code, i, vm, language_keys):
     # Integers
         else:
             try:
-                analysis.append(IntegerTok(int(word)))
+                analysis.append(int_tok(int(word)))
             except IntOutOfRng:
                 raise IntOutOfRng(word)
             except Exception:
@@ -383,24 +423,16 @@ def sep_line_wasm(code, i, vm, language_keys):
     return (analysis, code)
 
 
-def lex(code, vm):
+def strip_lines(lines):
     """
-    Lexical phase: tokenizes the code.
+    Strips comments and blanks from lines of code.
 
     Args:
-        code: The code to lexically analyze.
-        vm: virtual machine
+        lines: Iterable of lines of code
 
-    Returns:
-        tok_lines: the tokenized version
+    Yields:
+        The lines that are left with something in them
     """
-    lines = code.split("\n")
-
-    pre_processed_lines = []
-    tok_lines = []  # this will hold the tokenized version of the code
-    i = 0
-    add_to_ip = True
-    data_sec = False    # used for AT&T version
     for line in lines:
         # comments:
         comm_start = line.find(";")
@@ -414,20 +446,50 @@ def lex(code, vm):
         if len(line) == 0:  # blank lines ok; just skip 'em
             continue
 
-        pre_processed_lines.append(line)
-
-    # we've stripped extra whitespace, comments, and labels:
-    # now perform lexical analysis
-    for line in pre_processed_lines:
-        # create language-specific dictionary:
-        language_keys = make_language_keys(vm)
-        if vm.flavor == "mips_mml":
-            tok_lines.append(sep_line_mml(line, i, vm, language_keys))
-        elif vm.flavor == "wasm":
-            tok_lines.append(sep_line_wasm(line, i, vm, language_keys))
-        else:
-            tok_lines.append(sep_line(line, i, data_sec,
-                                      vm, language_keys))
+        yield line
+
+
+def lex_lines(lines, vm, labels):
+    """
+    Lexical phase, a line at a time: tokenizes lines as they are
+    read, so the code never has to be held in memory all at once.
+
+    Args:
+        lines: Iterable of lines of code
+        vm: virtual machine
+        labels: Dictionary that receives the labels defined in the code
+
+    Yields:
+        The tokenized version of each line of code
+    """
+    i = 0
+    add_to_ip = True
+    data_sec = False    # used for AT&T version
+
+    # language-specific dictionary:
+    language_keys = get_language_keys(vm)
+    lexed = get_line_caches(vm).lexed
+
+    # we strip extra whitespace and comments:
+    # then perform lexical analysis
+    for line in strip_lines(lines):
+        # lines we have lexed before are taken from the cache:
+        key = (vm.flavor, vm.base, data_sec, line)
+        lexed_line = lexed.get(key)
+        if lexed_line is None:
+            line_labels = {}
+            if vm.flavor == "mips_mml":
+                analysis = sep_line_mml(line, i, vm, language_keys)
+            elif vm.flavor == "wasm":
+                analysis = sep_line_wasm(line, i, vm, language_keys)
+            else:
+                analysis = sep_line(line, i, data_sec,
+                                    vm, language_keys, line_labels)
+            lexed_line = LexedLine(analysis[0], analysis[1], line_labels)
+            lexed.put(key, lexed_line)
+        for label in lexed_line.labels:
+            labels[label] = label_loc(i, vm)
+        yield (list(lexed_line.tokens), lexed_line.code)
         if line == ".data":
             add_to_ip = False
             data_sec = True
@@ -440,4 +502,36 @@ def lex(code, vm):
         # we count line numbers to store label jump locations:
         if add_to_ip:
             i += 1
-    return tok_lines
+
+
+def lex(code, vm, labels):
+    """
+    Lexical phase: tokenizes the code.
+
+    Args:
+        code: The code to lexically analyze.
+        vm: virtual machine
+        labels: Dictionary that receives the labels defined in the code
+
+    Returns:
+        tok_lines: the tokenized version
+    """
+    return list(lex_lines(code.split("\n"), vm, labels))
+
+
+def find_labels(lines, vm):
+    """
+    The first pass over code we are streaming: as a line may jump to a
+    label further down, we need all the labels before we can parse.
+
+    Args:
+        lines: Iterable of lines of code
+        vm: virtual machine
+
+    Returns:
+        Dictionary of the labels defined in the code
+    """
+    labels = {}
+    for tok_line in lex_lines(lines, vm, labels):
+        pass
+    return labels
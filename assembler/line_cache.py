@@ -0,0 +1,122 @@
+"""
+line_cache.py: caches of lexed and parsed lines, so that when a program
+is edited and run again, only the lines that changed are lexed and
+parsed again.
+Lines hold tokens that refer to a machine, so each machine
+has caches of its own.
+"""
+
+import threading
+from collections import OrderedDict
+from weakref import WeakKeyDictionary
+
+LINE_CACHE_SIZE = 4096
+
+
+class LineCache:
+    """
+    A least-recently-used cache of lines, keyed by the line's text
+    and whatever else the result depends on.
+    """
+    def __init__(self, size=LINE_CACHE_SIZE):
+        self.size = size
+        self.lines = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.lines)
+
+    def get(self, key, check=None):
+        """
+        Returns the entry for key, or None if there is none,
+        or if check(entry) says it is out of date.
+        """
+        entry = self.lines.get(key)
+        if entry is None or (check is not None and not check(entry)):
+            self.misses += 1
+            return None
+        self.lines.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        self.lines[key] = entry
+        self.lines.move_to_end(key)
+        while len(self.lines) > self.size:
+            self.lines.popitem(last=False)
+
+    def clear(self):
+        self.lines.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class LexedLine:
+    """
+    What lex() made of a line: its tokens, and the labels it defines.
+    Where a label points depends on where the line sits in the program,
+    so only the label names are kept.
+    """
+    def __init__(self, tokens, code, labels):
+        self.tokens = tuple(tokens)
+        self.code = code
+        self.labels = tuple(labels)
+
+
+class ParsedLine:
+    """
+    What parse() made of an instruction, along with the names the
+    instruction looked up: it is only good for a program in which
+    those names mean the same.
+    """
+    def __init__(self, unit, line_names):
+        self.unit = tuple(unit)
+        self.labels = dict(line_names.labels_used)
+        self.symbols = dict(line_names.symbols_used)
+
+    def matches(self, names):
+        """
+        Args:
+            names: Names of the program being parsed
+
+        Returns:
+            True if the names the line uses mean the same in names
+        """
+        for name, value in self.labels.items():
+            if names.label(name) != value:
+                return False
+        for name, value in self.symbols.items():
+            if names.symbol(name) != value:
+                return False
+        return True
+
+
+class LineCaches:
+    """
+    The lexed and parsed lines of a machine.
+    """
+    def __init__(self):
+        self.lexed = LineCache()
+        self.parsed = LineCache()
+
+    def clear(self):
+        self.lexed.clear()
+        self.parsed.clear()
+
+
+# shared by the threads serving the website, hence the lock:
+machine_lines = WeakKeyDictionary()
+lines_lock = threading.Lock()
+
+
+def get_line_caches(vm):
+    """
+    Returns the LineCaches of vm, making them the first time.
+    """
+    with lines_lock:
+        caches = machine_lines.get(vm)
+        if caches is None:
+            caches = LineCaches()
+            machine_lines[vm] = caches
+        return caches
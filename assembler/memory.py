@@ -0,0 +1,314 @@
+"""
+memory.py: the memory of our virtual machines.
+"""
+
+from abc import abstractmethod
+from collections.abc import MutableMapping
+from itertools import repeat
+
+from .errors import InvalidMemLoc
+
+EMPTY = None    # marks a cell that has never been written
+
+PAGE_BITS = 12
+PAGE_SIZE = 1 << PAGE_BITS      # 4 KiB of addresses
+PAGE_MASK = PAGE_SIZE - 1
+ADDR_SPACE = 1 << 32
+
+
+def hex_addr(addr):
+    """
+    Returns the hex string we show for memory address addr.
+    """
+    return hex(addr).split('x')[-1].upper()
+
+
+def int_addr(key):
+    """
+    Converts a memory key, either an integer address or
+    a hex string as shown on the website, to an integer address.
+    """
+    if isinstance(key, int):
+        return key
+    try:
+        return int(key, 16)
+    except (TypeError, ValueError):
+        raise KeyError(key)
+
+
+class CellStore(MutableMapping):
+    """
+    Memory cells addressed by integers.
+    Each cell holds a whole value (an integer or a float), as our
+    machines store a value per address rather than a byte.
+
+    Subclasses say where the cells live by providing
+    load(), store(), erase(), clear() and addresses().
+    They may also provide faster ways to store many cells at once
+    than store_block() and fill() do here.
+
+    For the website, memory also works as a dictionary keyed by
+    hex strings: iterating gives the hex addresses of the cells
+    written, in address order.
+    """
+    def __init__(self):
+        self.used = 0
+
+    @abstractmethod
+    def load(self, addr, default=0):
+        """
+        Returns the value at integer address addr,
+        or default if nothing has been stored there.
+        """
+
+    @abstractmethod
+    def store(self, addr, value):
+        """
+        Stores value at integer address addr.
+        """
+
+    @abstractmethod
+    def erase(self, addr):
+        """
+        Empties the cell at addr; returns False if it was empty already.
+        """
+
+    def store_block(self, addr, values, step=1):
+        """
+        Stores values in the cells at addr, addr + step, addr + 2 * step...
+        """
+        for value in values:
+            self.store(addr, value)
+            addr += step
+
+    def fill(self, addr, count, value, step=1):
+        """
+        Stores value in count cells, starting at addr, step cells apart.
+        """
+        self.store_block(addr, repeat(value, count), step)
+
+    @abstractmethod
+    def addresses(self):
+        """
+        Yields the integer addresses of the cells written,
+        in address order.
+        """
+
+    def __getitem__(self, key):
+        value = self.load(int_addr(key), EMPTY)
+        if value is EMPTY:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.store(int_addr(key), value)
+
+    def __delitem__(self, key):
+        if not self.erase(int_addr(key)):
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            return self.load(int_addr(key), EMPTY) is not EMPTY
+        except (KeyError, InvalidMemLoc):
+            return False
+
+    def __iter__(self):
+        for addr in self.addresses():
+            yield hex_addr(addr)
+
+    def __len__(self):
+        return self.used
+
+    def __str__(self):
+        return str(dict(self.items()))
+
+
+class PagedMemory(CellStore):
+    """
+    Memory for the MIPS and RISC-V machines, which use the whole
+    32-bit address space: text, data and stack sit far apart.
+    Cells live in 4 KiB pages, made the first time they are written.
+    """
+    def __init__(self):
+        super().__init__()
+        self.pages = {}
+
+    def check_addr(self, addr):
+        if not 0 <= addr < ADDR_SPACE:
+            raise InvalidMemLoc(hex(addr))
+
+    def load(self, addr, default=0):
+        page = self.pages.get(addr >> PAGE_BITS)
+        if page is None:
+            self.check_addr(addr)
+            return default
+        value = page[addr & PAGE_MASK]
+        if value is EMPTY:
+            return default
+        return value
+
+    def store(self, addr, value):
+        page = self.pages.get(addr >> PAGE_BITS)
+        if page is None:
+            self.check_addr(addr)
+            page = [EMPTY] * PAGE_SIZE
+            self.pages[addr >> PAGE_BITS] = page
+        if page[addr & PAGE_MASK] is EMPTY:
+            self.used += 1
+        page[addr & PAGE_MASK] = value
+
+    def store_block(self, addr, values, step=1):
+        values = list(values)
+        if len(values) == 0:
+            return
+        self.check_addr(addr)
+        self.check_addr(addr + (len(values) - 1) * step)
+        i = 0
+        while i < len(values):
+            page = self.pages.get(addr >> PAGE_BITS)
+            if page is None:
+                page = [EMPTY] * PAGE_SIZE
+                self.pages[addr >> PAGE_BITS] = page
+            offset = addr & PAGE_MASK
+            # how many of the values go in this page:
+            count = min((PAGE_SIZE - offset + step - 1) // step,
+                        len(values) - i)
+            end = offset + count * step
+            self.used += page[offset:end:step].count(EMPTY)
+            page[offset:end:step] = values[i:i + count]
+            i += count
+            addr += count * step
+
+    def fill(self, addr, count, value, step=1):
+        self.store_block(addr, [value] * count, step)
+
+    def erase(self, addr):
+        page = self.pages.get(addr >> PAGE_BITS)
+        if page is None or page[addr & PAGE_MASK] is EMPTY:
+            return False
+        page[addr & PAGE_MASK] = EMPTY
+        self.used -= 1
+        return True
+
+    def clear(self):
+        self.pages.clear()
+        self.used = 0
+
+    def addresses(self):
+        for page_num in sorted(self.pages):
+            base = page_num << PAGE_BITS
+            for offset, value in enumerate(self.pages[page_num]):
+                if value is not EMPTY:
+                    yield base + offset
+
+
+class Memory(PagedMemory):
+    """
+    Memory for the Intel machines: cells in the 32-bit address space
+    live in pages made the first time they are written, so a large
+    memory costs nothing until it is used, and clearing it costs only
+    the pages written; a program may also use addresses outside that
+    space, and those cells go in a dictionary.
+    """
+    def __init__(self):
+        super().__init__()
+        self.far_cells = {}
+
+    def load(self, addr, default=0):
+        page = self.pages.get(addr >> PAGE_BITS)
+        if page is not None:
+            value = page[addr & PAGE_MASK]
+        elif 0 <= addr < ADDR_SPACE:
+            return default
+        else:
+            value = self.far_cells.get(addr, EMPTY)
+        if value is EMPTY:
+            return default
+        return value
+
+    def store(self, addr, value):
+        if 0 <= addr < ADDR_SPACE:
+            page = self.pages.get(addr >> PAGE_BITS)
+            if page is None:
+                page = [EMPTY] * PAGE_SIZE
+                self.pages[addr >> PAGE_BITS] = page
+            if page[addr & PAGE_MASK] is EMPTY:
+                self.used += 1
+            page[addr & PAGE_MASK] = value
+        else:
+            if addr not in self.far_cells:
+                self.used += 1
+            self.far_cells[addr] = value
+
+    def store_block(self, addr, values, step=1):
+        values = list(values)
+        end = addr + len(values) * step
+        if addr < 0 or end - step >= ADDR_SPACE:
+            CellStore.store_block(self, addr, values, step)
+            return
+        super().store_block(addr, values, step)
+
+    def erase(self, addr):
+        if 0 <= addr < ADDR_SPACE:
+            return super().erase(addr)
+        elif addr in self.far_cells:
+            del self.far_cells[addr]
+            self.used -= 1
+            return True
+        return False
+
+    def clear(self):
+        super().clear()
+        self.far_cells.clear()
+
+    def addresses(self):
+        far_addrs = sorted(self.far_cells)
+        below = [addr for addr in far_addrs if addr < 0]
+        yield from below
+        yield from super().addresses()
+        yield from far_addrs[len(below):]
+
+
+class Stack(CellStore):
+    """
+    The stack: every cell from bottom to top, all holding empty_val
+    to start. Only the cells written since the stack was last cleared
+    are kept, in a dictionary keyed by address - bottom, so clearing
+    the stack costs the same however large it is.
+    Only every step-th cell down from the top is shown on the website,
+    so those are what iterating over the stack gives, top first.
+    """
+    def __init__(self, bottom, top, step=1, empty_val=0):
+        super().__init__()
+        self.bottom = bottom
+        self.top = top
+        self.step = step
+        self.empty_val = empty_val
+        self.size = top - bottom + 1
+        self.cells = {}
+        self.used = len(range(top - step + 1, bottom - 1, -step))
+
+    def load(self, addr, default=0):
+        index = addr - self.bottom
+        if index < 0 or index >= self.size:
+            return default
+        return self.cells.get(index, self.empty_val)
+
+    def store(self, addr, value):
+        index = addr - self.bottom
+        if index < 0 or index >= self.size:
+            raise InvalidMemLoc(hex(addr))
+        self.cells[index] = value
+
+    def erase(self, addr):
+        if self.load(addr, EMPTY) is EMPTY:
+            return False
+        self.store(addr, self.empty_val)
+        return True
+
+    def clear(self):
+        self.cells = {}
+
+    def addresses(self):
+        return range(self.top - self.step + 1, self.bottom - 1, -self.step)
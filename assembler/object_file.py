@@ -0,0 +1,250 @@
+"""
+object_file.py: saves assembled programs to object files, and loads
+them back, so a program we have assembled before need not be lexed
+and parsed again.
+
+An object file is a header (OBJ_MAGIC and the format version), then the
+program marshalled: its instructions, with the source line of each,
+its label and symbol tables and its data image.
+Tokens are saved as tuples of their kind and what they were made from.
+"""
+
+import os
+import marshal
+import struct
+
+from .errors import InvalidObjFile
+from .lex import get_language_keys
+from .program import Names, Program
+from .tokens import Instruction, IntegerTok, FloatTok, StringTok
+from .tokens import RegAddress, Address, Register, Label, make_register
+from .tokens import Symbol, NewSymbol
+
+OBJ_MAGIC = b"EMU86OBJ"
+OBJ_VERSION = 2
+OBJ_HEADER = struct.Struct("<8sH")
+OBJ_EXT = ".emo"
+
+INSTR = 0
+INTEGER = 1
+FLOAT = 2
+STRING = 3
+REG_ADDRESS = 4
+ADDRESS = 5
+REGISTER = 6
+LABEL = 7
+SYMBOL = 8
+NEW_SYMBOL = 9
+
+
+def object_name(key, obj_dir):
+    """
+    Returns the path of the object file for the program
+    with cache key key in directory obj_dir.
+    """
+    return os.path.join(obj_dir, key + OBJ_EXT)
+
+
+def instr_keys(vm):
+    """
+    Returns a dictionary from the id of each instruction token of vm's
+    flavor to a key word for it, so we can save instructions by name.
+    """
+    keys = {}
+    for key, token in get_language_keys(vm).items():
+        if isinstance(token, Instruction):
+            keys.setdefault(id(token), key)
+    return keys
+
+
+def encode_token(token, keys):
+    """
+    Returns the tuple we save for token.
+
+    Args:
+        token: Token of a parsed instruction
+        keys: Key words of the instructions, by id
+
+    Returns:
+        A tuple of the token's kind and what it is made from
+    """
+    if isinstance(token, Instruction):
+        return (INSTR, keys[id(token)])
+    elif isinstance(token, IntegerTok):
+        return (INTEGER, token.get_val(), token.con)
+    elif isinstance(token, FloatTok):
+        return (FLOAT, token.get_type(), token.value)
+    elif isinstance(token, StringTok):
+        return (STRING, token.get_nm())
+    elif isinstance(token, RegAddress):
+        return (REG_ADDRESS, token.get_nm(),
+                encode_disp(token.displacement, keys), token.multiplier)
+    elif isinstance(token, Address):
+        return (ADDRESS, token.get_nm())
+    elif isinstance(token, Register):
+        return (REGISTER, token.get_nm(), token.get_multiplier())
+    elif isinstance(token, Label):
+        return (LABEL, token.get_nm(), token.value)
+    elif isinstance(token, Symbol):
+        return (SYMBOL, token.get_nm())
+    elif isinstance(token, NewSymbol):
+        return (NEW_SYMBOL, token.get_nm())
+    raise InvalidObjFile("can't save " + str(token))
+
+
+def encode_disp(disp, keys):
+    """
+    Returns what we save for the displacement of an address:
+    a number, a register, or a list of them.
+    """
+    if isinstance(disp, list):
+        return [encode_disp(item, keys) for item in disp]
+    elif isinstance(disp, Register):
+        return encode_token(disp, keys)
+    return disp
+
+
+def decode_disp(code, vm, language_keys):
+    """
+    Makes the displacement saved as code.
+    """
+    if isinstance(code, list):
+        return [decode_disp(item, vm, language_keys) for item in code]
+    elif isinstance(code, tuple):
+        return decode_token(code, vm, language_keys)
+    return code
+
+
+def decode_token(code, vm, language_keys):
+    """
+    Makes the token saved as code.
+
+    Args:
+        code: A tuple made by encode_token()
+        vm: Virtual machine to make the token for
+        language_keys: Key terms of vm's flavor
+
+    Returns:
+        The token
+    """
+    kind = code[0]
+    if kind == INSTR:
+        return language_keys[code[1]]
+    elif kind == INTEGER:
+        return IntegerTok(code[1], code[2])
+    elif kind == FLOAT:
+        return FloatTok(code[1], code[2])
+    elif kind == STRING:
+        return StringTok(code[1])
+    elif kind == REG_ADDRESS:
+        return RegAddress(code[1], vm,
+                          decode_disp(code[2], vm, language_keys), code[3])
+    elif kind == ADDRESS:
+        return Address(code[1], vm)
+    elif kind == REGISTER:
+        register = make_register(code[1], vm)
+        register.set_multiplier(code[2])
+        return register
+    elif kind == LABEL:
+        return Label(code[1], vm, code[2])
+    elif kind == SYMBOL:
+        return Symbol(code[1], vm)
+    elif kind == NEW_SYMBOL:
+        return NewSymbol(code[1], vm)
+    raise InvalidObjFile("unknown token kind " + str(kind))
+
+
+def save_object(program, file_nm, key=None):
+    """
+    Writes program to object file file_nm.
+
+    Args:
+        program: Program to save
+        file_nm: Path of the object file
+        key: Cache key of the program's source, if it is to be checked
+             when the program is loaded
+    """
+    keys = instr_keys(program.vm)
+    obj = {
+        "flavor": program.vm.flavor,
+        "base": program.vm.base,
+        "key": key,
+        "instrs": [([encode_token(token, keys) for token in tokens], source)
+                   for (tokens, source) in program.instrs],
+        "labels": dict(program.labels),
+        "symbols": list(program.symbols.items()),
+        "data": list(program.data),
+        "start_ip": program.start_ip,
+        "resets": program.resets,
+        "outside_labels": dict(program.outside_labels),
+        "outside_symbols": dict(program.outside_symbols),
+    }
+    with open(file_nm, "wb") as obj_file:
+        obj_file.write(OBJ_HEADER.pack(OBJ_MAGIC, OBJ_VERSION))
+        marshal.dump(obj, obj_file)
+
+
+def load_object(file_nm, vm, key=None):
+    """
+    Reads the program in object file file_nm.
+
+    Args:
+        file_nm: Path of the object file
+        vm: Virtual machine the program is for
+        key: If given, the cache key the program's source must have
+
+    Returns:
+        A Program
+    """
+    with open(file_nm, "rb") as obj_file:
+        header = obj_file.read(OBJ_HEADER.size)
+        if len(header) != OBJ_HEADER.size:
+            raise InvalidObjFile(file_nm)
+        (magic, version) = OBJ_HEADER.unpack(header)
+        if magic != OBJ_MAGIC or version != OBJ_VERSION:
+            raise InvalidObjFile(file_nm)
+        try:
+            obj = marshal.load(obj_file)
+        except (EOFError, ValueError, TypeError):
+            raise InvalidObjFile(file_nm)
+    if obj["flavor"] != vm.flavor or obj["base"] != vm.base:
+        raise InvalidObjFile(file_nm + " is for " + str(obj["flavor"])
+                             + " " + str(obj["base"]))
+    if key is not None and obj["key"] != key:
+        raise InvalidObjFile(file_nm)
+    language_keys = get_language_keys(vm)
+    instrs = [([decode_token(code, vm, language_keys) for code in tokens],
+               source)
+              for (tokens, source) in obj["instrs"]]
+    names = Names(vm, obj["labels"])
+    for name, mem_loc in obj["symbols"]:
+        names.define_symbol(name, mem_loc)
+    names.outside_labels.update(obj["outside_labels"])
+    names.outside_symbols.update(obj["outside_symbols"])
+    return Program(instrs, names, obj["data"], obj["start_ip"],
+                   obj["resets"])
+
+
+def find_object(key, vm, obj_dir):
+    """
+    Looks in obj_dir for the object file of the program with
+    cache key key.
+
+    Args:
+        key: Cache key of the program's source
+        vm: Virtual machine
+        obj_dir: Directory of object files
+
+    Returns:
+        The Program, or None if there is no good object file for it
+    """
+    file_nm = object_name(key, obj_dir)
+    if not os.path.isfile(file_nm):
+        return None
+    try:
+        program = load_object(file_nm, vm, key)
+    except InvalidObjFile:
+        return None
+    if not program.matches(vm):
+        return None
+    return program
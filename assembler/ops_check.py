@@ -1,4 +1,5 @@
 from assembler.errors import check_num_args
+from assembler.tokens import Address, Register
 
 
 def checkFloat(ops):
@@ -23,4 +24,15 @@ def one_op_arith(ops, vm, instr, operator):
     """
     check_num_args(instr, ops, 1)
     ops[0].set_val(operator(ops[0].get_val()))
-    vm.changes.add(ops[0].get_nm())
+    add_dest_change(ops[0], vm)
+
+
+def add_dest_change(dest, vm):
+    """
+    Records the change to the register or memory cell
+    an instruction wrote its result to.
+    """
+    if isinstance(dest, Register):
+        vm.changes.add_register(dest.get_nm())
+    elif isinstance(dest, Address):
+        vm.changes.add_memory(dest.get_addr())
@@ -2,6 +2,7 @@
 parse.py: creates parse tree.
 """
 
+from copy import copy
 from random import randrange
 
 from .errors import InvalidMemLoc, InvalidInstruction
@@ -17,6 +18,9 @@ from .tokens import OpenParen, CloseParen, OpenBracket, CloseBracket
 from .tokens import PlusTok, MinusTok, ConstantSign
 from .tokens import FloatTok
 from .virtual_machine import MEM_SIZE
+from .program import Names, LineNames, Program, DATA_BLOCK, DATA_FILL
+from .line_cache import ParsedLine, get_line_caches
+from .trace import add_debug, DEBUG
 
 TOKENS = 0
 CODE = 1
@@ -43,10 +47,6 @@ PARAM_TYPE = 1
 PARAM_VAL = 0
 
 
-def add_debug(s, vm):
-    vm.debug += (s + "\n")
-
-
 def minus_token(token_line, pos):
     """
     Negates the next token if minus token found
@@ -57,14 +57,14 @@ def minus_token(token_line, pos):
     """
     try:
         if isinstance(token_line[pos + 1], IntegerTok):
-            token_line[pos + 1].negate_val()
+            token_line[pos + 1] = token_line[pos + 1].negated()
         else:
             raise InvalidArgument("-")
     except Exception:
         raise InvalidArgument("-")
 
 
-def register_token(token_line, pos, vm):
+def register_token(token_line, pos, vm, names):
     if vm.flavor == "intel" or vm.flavor == "att":
 
         return (token_line[pos], pos + 1)
@@ -72,14 +72,14 @@ def register_token(token_line, pos, vm):
           isinstance(token_line[pos + 1], OpenParen)):
         reg = None
         disp = None
-        reg, disp, pos = get_address_mips(token_line, pos + 2, vm,
+        reg, disp, pos = get_address_mips(token_line, pos + 2, vm, names,
                                           token_line[pos])
         return (RegAddress(reg.get_nm(), vm, disp), pos)
     else:
         return (token_line[pos], pos + 1)
 
 
-def number_token(token_line, pos, vm):
+def number_token(token_line, pos, vm, names):
     """
     If token seen is an integer, determine by flavor whether
     to return the integer token or return an address token
@@ -88,6 +88,7 @@ def number_token(token_line, pos, vm):
         token_line: Line of code
         pos: Position where integer token is seen
         vm: Virtual machine
+        names: Names of the program being parsed
 
     Returns:
         Integer or address token, next positon to look at
@@ -100,10 +101,10 @@ def number_token(token_line, pos, vm):
         reg = None
         disp = None
         if vm.flavor == "att":
-            reg, disp, pos = get_address_att(token_line, pos + 2, vm,
+            reg, disp, pos = get_address_att(token_line, pos + 2, vm, names,
                                              token_line[pos].get_val())
         else:
-            reg, disp, pos = get_address_mips(token_line, pos + 2, vm,
+            reg, disp, pos = get_address_mips(token_line, pos + 2, vm, names,
                                               token_line[pos].get_val())
         if reg:
             return (RegAddress(reg.get_nm(), vm, disp,
@@ -117,7 +118,7 @@ def number_token(token_line, pos, vm):
         return (token_line[pos], pos + 1)
 
 
-def symbol_token(token_line, pos, vm):
+def symbol_token(token_line, pos, vm, names):
     """
     If token seen is a symbol, determine by flavor whether
     to return the symbol token or return an address token
@@ -126,6 +127,7 @@ def symbol_token(token_line, pos, vm):
         token_line: Line of code
         pos: Position where integer token is seen
         vm: Virtual machine
+        names: Names of the program being parsed
 
     Returns:
         Symbol or address token, next positon to look at
@@ -134,8 +136,9 @@ def symbol_token(token_line, pos, vm):
         return (Symbol(token_line[pos].get_nm(), vm), pos + 1)
     elif (pos + 1 < len(token_line) and
           isinstance(token_line[pos + 1], OpenParen)):
-        reg, disp, pos = get_address_mips(token_line, pos + 2, vm,
-                                          vm.symbols[token_line[pos].get_nm()])
+        mem_loc = names.symbol(token_line[pos].get_nm())
+        reg, disp, pos = get_address_mips(token_line, pos + 2, vm, names,
+                                          mem_loc)
         return (RegAddress(reg.get_nm(), vm, disp,
                            reg.get_multiplier()), pos)
     else:
@@ -203,7 +206,7 @@ def get_data_token(token_line, pos):
     if isinstance(token_line[pos], MinusTok):
         try:
             if isinstance(token_line[pos + 1], IntegerTok):
-                token_line[pos + 1].negate_val()
+                token_line[pos + 1] = token_line[pos + 1].negated()
                 return get_data_token(token_line, pos + 1)
             else:
                 raise InvalidDataVal("-")
@@ -299,68 +302,72 @@ def parse_dup_token(token_line, data_type, pos):
         pos = Position of integer token
 
     Returns:
-        List of duplicated values
+        Value to duplicate, number of times, next position
     """
-    dup_list = None
     duplicate = token_line[pos].get_val()
     value, pos = get_DUP_value(token_line, pos + 2)
     if value == DONT_INIT:
-        dup_list = [randrange(0, dtype_info[data_type][MAX_VAL])] * duplicate
-    else:
-        dup_list = [value] * duplicate
-    return (dup_list, pos)
+        value = randrange(0, dtype_info[data_type][MAX_VAL])
+    return (value, duplicate, pos)
 
 
 def get_values(token_line, data_type, pos, values_list):
     """
     Creates a list of values for each variable when it is declared.
+    A DUP is kept as a run: the value, and the number of times
+    it is repeated.
 
     Args:
         token_line: List of data tokens
         data_type: Data type of variable
         pos: Beginning pos to parse from
-        values_list: List of values
+        values_list: List of (value, count) runs
 
     Returns:
-        List of integer values
-    """
-    if pos >= len(token_line):
-        raise MissingData()
-    elif isinstance(token_line[pos], StringTok):
-        ascii_list, pos = parse_string_token(token_line, pos)
-        values_list.extend(ascii_list)
-    else:
-        first_data, pos = get_data_token(token_line, pos)
-        if first_data == DONT_INIT:
-            values_list.append(randrange(0, dtype_info[data_type][MAX_VAL]))
+        List of (value, count) runs
+    """
+    while True:
+        if pos >= len(token_line):
+            raise MissingData()
+        elif isinstance(token_line[pos], StringTok):
+            ascii_list, pos = parse_string_token(token_line, pos)
+            values_list.extend((letter, 1) for letter in ascii_list)
         else:
-            values_list.append(first_data)
-    if pos >= len(token_line):
-        return values_list, pos
-    else:
+            first_data, pos = get_data_token(token_line, pos)
+            if first_data == DONT_INIT:
+                values_list.append((randrange(0,
+                                              dtype_info[data_type][MAX_VAL]),
+                                    1))
+            else:
+                values_list.append((first_data, 1))
+        if pos >= len(token_line):
+            return values_list, pos
         next_term = token_line[pos]
         if isinstance(next_term, DupTok):
             values_list.pop()
-            dup_list, pos = parse_dup_token(token_line, data_type, pos - 1)
-            values_list.extend(dup_list)
-            try:
-                next_term = token_line[pos]
-            except Exception:
+            value, count, pos = parse_dup_token(token_line, data_type,
+                                                pos - 1)
+            values_list.append((value, count))
+            if pos >= len(token_line):
                 return values_list, pos
+            next_term = token_line[pos]
         if isinstance(next_term, Comma):
-            return get_values(token_line, data_type, pos + 1, values_list)
+            pos += 1
         else:
             raise InvalidDataVal(token_line[pos].get_nm())
 
 
-def parse_data_token(token_line, vm, mem_loc):
+def parse_data_token(token_line, vm, names, mem_loc, data_image):
     """
     Parses data tokens, assigns each value to a memory location
 
     Args:
         token_line: List of data tokens
         vm: Virtual machine
+        names: Names of the program being parsed
         mem_loc: Starting memory storage location
+        data_image: List that receives the data segments (see
+                    program.py), or None if the values aren't to be stored
 
     Returns:
         Returns the next memory location to be used
@@ -377,19 +384,35 @@ def parse_data_token(token_line, vm, mem_loc):
     data_vals, pos = get_values(token_line, data_type, pos, data_vals)
 
     # store memory location
-    vm.symbols[symbol] = mem_loc
-    add_debug("Symbol table now holds " + str(mem_loc), vm)
-    for value in data_vals:
-        if vm.get_data_init() == "on":
-            vm.memory[hex(mem_loc).split('x')[-1].upper()] = value
-        if vm.flavor == "mips_asm" or vm.flavor == "riscv":
-            mem_loc += 4
+    names.define_symbol(symbol, mem_loc)
+    add_debug("Symbol table now holds " + str(mem_loc), vm, DEBUG)
+    if vm.flavor == "mips_asm" or vm.flavor == "riscv":
+        step = 4
+    else:
+        step = 1
+    # values in a row become a block, stored with one slice;
+    # a DUP becomes a fill:
+    block = []
+    block_loc = mem_loc
+    for value, count in data_vals:
+        if count == 1:
+            block.append(value)
         else:
-            mem_loc += 1
-    return mem_loc
-
-
-def get_term(token_line, pos, vm):
+            if data_image is not None:
+                if block:
+                    data_image.append((DATA_BLOCK, block_loc, step,
+                                       tuple(block)))
+                data_image.append((DATA_FILL, mem_loc + len(block) * step,
+                                   step, count, value))
+            mem_loc += (len(block) + count) * step
+            block = []
+            block_loc = mem_loc
+    if block and data_image is not None:
+        data_image.append((DATA_BLOCK, block_loc, step, tuple(block)))
+    return mem_loc + len(block) * step
+
+
+def get_term(token_line, pos, vm, names):
     """
     Returns the next term of the expression
 
@@ -397,6 +420,7 @@ def get_term(token_line, pos, vm):
         token_line: Line of code
         pos: Position of next term to be found
         vm: Virtual machine
+        names: Names of the program being parsed
 
     Returns:
         Next term token, position of token
@@ -404,8 +428,11 @@ def get_term(token_line, pos, vm):
     # call function again to get the negated term
     if isinstance(token_line[pos], MinusTok):
         try:
-            token_line[pos + 1].negate_val()
-            return get_term(token_line, pos + 1, vm)
+            if isinstance(token_line[pos + 1], IntegerTok):
+                token_line[pos + 1] = token_line[pos + 1].negated()
+            else:
+                token_line[pos + 1].negate_val()
+            return get_term(token_line, pos + 1, vm, names)
         except Exception:
             raise InvalidArgument(token_line[pos].get_nm())
     # integer or register term
@@ -414,7 +441,7 @@ def get_term(token_line, pos, vm):
         return (token_line[pos], pos)
     # symbol term
     elif isinstance(token_line[pos], NewSymbol):
-        if token_line[pos].get_nm() in vm.symbols:
+        if names.is_symbol(token_line[pos].get_nm()):
             return (Symbol(token_line[pos].get_nm(), vm), pos)
         else:
             raise InvalidMemLoc(token_line[pos].get_nm())
@@ -422,45 +449,124 @@ def get_term(token_line, pos, vm):
         raise InvalidMemLoc(token_line[pos].get_nm())
 
 
-REG = 0
-DISP_VAL = 1
-POSITION = 2
+def term_value(term, names):
+    """
+    Returns the value of a term of an address expression.
+    A symbol's value is its memory location, which we take from the
+    program being parsed rather than from the machine.
+    """
+    if isinstance(term, Symbol):
+        return names.symbol(term.get_nm())
+    return term.get_val()
+
+
+def add_disp(left, right):
+    """
+    Adds two displacements. A displacement that holds a register
+    is a list of its registers and integers, summed when the address
+    is used.
+    """
+    if isinstance(left, int) and isinstance(right, int):
+        return left + right
+    disp_list = []
+    for disp in (left, right):
+        if isinstance(disp, list):
+            disp_list.extend(disp)
+        else:
+            disp_list.append(disp)
+    return disp_list
+
+
+# what separates the terms of an address expression, by flavor:
+expr_separators = {
+    "intel": (PlusTok, MinusTok),
+    "att": (Comma,),
+}
+
+
+def get_terms(token_line, pos, vm, names):
+    """
+    Reads the terms of an address expression, along with what
+    separates them: which tokens those are depends on the flavor.
+
+    Args:
+        token_line: Line of code
+        pos: Position of address expression
+        vm: Virtual machine
+        names: Names of the program being parsed
+
+    Returns:
+        List of terms, list of their positions, list of the separators
+        after each term but the last, next position
+    """
+    separators = expr_separators.get(vm.flavor, ())
+    terms = []
+    term_posns = []
+    seps = []
+    end = len(token_line)
+    while True:
+        if pos >= end:
+            raise MissingOps()
+        term = token_line[pos]
+        if not isinstance(term, (IntegerTok, Register)):
+            term, pos = get_term(token_line, pos, vm, names)
+        terms.append(term)
+        term_posns.append(pos)
+        pos += 1
+        if pos < end and isinstance(token_line[pos], separators):
+            seps.append(token_line[pos])
+            pos += 1
+        else:
+            return (terms, term_posns, seps, pos)
 
 
-def get_expr_intel(token_line, pos, vm, reg):
+def get_expr_intel(token_line, pos, vm, names):
     """
-    Returns the register and the evaluated expression
+    Returns the register and the evaluated expression,
+    worked out left to right.
 
     Args:
         token_line: Line of code
         pos: Position of address expression
         vm: Virtual machine
+        names: Names of the program being parsed
 
     Returns:
         Register token, displacement, next position
     """
-    if len(token_line) < pos + 2:
-        return MissingOps()
-    left, pos = get_term(token_line, pos, vm)
-    if isinstance(left, Register):
-        reg = left
-    next_term = token_line[pos + 1]
-    if isinstance(next_term, PlusTok):
-        next_val_pos = get_expr_intel(token_line, pos + 2, vm, reg)
-        return (next_val_pos[REG], left.get_val() + next_val_pos[DISP_VAL],
-                next_val_pos[POSITION])
-    elif isinstance(next_term, MinusTok):
-        next_val_pos = get_expr_intel(token_line, pos + 2, vm, reg)
-        return (next_val_pos[REG], left.get_val() - next_val_pos[DISP_VAL],
-                next_val_pos[POSITION])
-    else:
-        return (reg, left.get_val(), pos + 1)
+    terms, term_posns, ops, pos = get_terms(token_line, pos, vm, names)
+    reg = None
+    values = []
+    for term in terms:
+        # registers are read when the address is used, not now:
+        if isinstance(term, IntegerTok):
+            value = term.value
+        elif isinstance(term, Register) and reg is None:
+            reg = term
+            value = 0
+        elif isinstance(term, Register):
+            value = term
+        else:
+            value = term_value(term, names)
+        values.append(value)
+    disp = values[0]
+    for (op, term, value) in zip(ops, terms[1:], values[1:]):
+        if isinstance(op, MinusTok):
+            # we can't subtract a register:
+            if isinstance(term, Register):
+                raise InvalidMemLoc(op.get_nm())
+            value = -value
+        if type(disp) is int and type(value) is int:
+            disp += value
+        else:
+            disp = add_disp(disp, value)
+    return (reg, disp, pos)
 
 
 SEC_REG = 0
 
 
-def get_expr_att(token_line, pos, vm, reg, disp_list):
+def get_expr_att(token_line, pos, vm, names):
     """
     Returns address expression for AT&T
 
@@ -468,45 +574,47 @@ def get_expr_att(token_line, pos, vm, reg, disp_list):
         token_line: Line of code
         pos: Position of address
         vm: Virtual machine
-        disp_list: List of displacements
+        names: Names of the program being parsed
 
     Returns:
         Register token, displacement(s), next position
     """
-    if len(token_line) < pos + 2:
-        return MissingOps()
-    left, pos = get_term(token_line, pos, vm)
-
-    # Retrieved Register Term
-    if isinstance(left, Register) and reg is None:
-        reg = left
-    elif isinstance(left, Register) and disp_list[SEC_REG] is None:
-        disp_list[SEC_REG] = left
-
-    # at most two registers allowed
-    elif isinstance(left, Register):
-        raise InvalidMemLoc(token_line[pos].get_nm())
+    terms, term_posns, seps, pos = get_terms(token_line, pos, vm, names)
+    reg = None
+    disp_list = [None]
+    for (left, term_pos) in zip(terms, term_posns):
+        if isinstance(left, Register):
+            # register tokens are shared by every line lexed:
+            # give this address its own, to carry its multiplier
+            left = copy(left)
+            token_line[term_pos] = left
+
+        # Retrieved Register Term
+        if isinstance(left, Register) and reg is None:
+            reg = left
+        elif isinstance(left, Register) and disp_list[SEC_REG] is None:
+            disp_list[SEC_REG] = left
+
+        # at most two registers allowed
+        elif isinstance(left, Register):
+            raise InvalidMemLoc(left.get_nm())
+
+        # Retrieved Integer term
+        elif isinstance(left, IntegerTok):
+            if token_line[term_pos - 2] is reg:
+                reg.set_multiplier(left.get_val())
+            elif token_line[term_pos - 2] is disp_list[SEC_REG]:
+                disp_list[SEC_REG].set_multiplier(left.get_val())
+            else:
+                disp_list.append(left.get_val())
 
-    # Retrieved Integer term
-    elif isinstance(left, IntegerTok):
-        if token_line[pos - 2] == reg:
-            reg.set_multiplier(left.get_val())
-        elif token_line[pos - 2] == disp_list[SEC_REG]:
-            disp_list[SEC_REG].set_multiplier(left.get_val())
+        # Retrieved Symbol term
         else:
-            disp_list.append(left.get_val())
-
-    # Retrieved Symbol term
-    else:
-        disp_list.append(vm.symbols[token_line[pos].get_nm()])
-    next_term = token_line[pos + 1]
-    if isinstance(next_term, Comma):
-        return get_expr_att(token_line, pos + 2, vm, reg, disp_list)
-    else:
-        return (reg, disp_list, pos + 1)
+            disp_list.append(names.symbol(token_line[term_pos].get_nm()))
+    return (reg, disp_list, pos)
 
 
-def get_expr_mips(token_line, pos, vm):
+def get_expr_mips(token_line, pos, vm, names):
     """
     Returns address expression for MIPS
 
@@ -514,21 +622,20 @@ def get_expr_mips(token_line, pos, vm):
         token_line: Line of code
         pos: Position of address
         vm: Virtual machine
+        names: Names of the program being parsed
 
     Returns:
         Token term, next position
     """
-
-    if pos >= len(token_line):
-        raise MissingOps()
-    left, pos = get_term(token_line, pos, vm)
+    terms, term_posns, seps, pos = get_terms(token_line, pos, vm, names)
+    left = terms[0]
     if isinstance(left, Register):
-        return (left, pos + 1)
+        return (left, pos)
     else:
         raise InvalidMemLoc(left.get_nm())
 
 
-def get_address_intel(token_line, pos, vm):
+def get_address_intel(token_line, pos, vm, names):
     """
     Converts a sublist of the tokenized instruction into
     corresponding address token
@@ -537,6 +644,7 @@ def get_address_intel(token_line, pos, vm):
         token_line: List of instruction tokens
         pos: Beginning position in list
         vm: Virtual machine
+        names: Names of the program being parsed
 
     Returns:
         Register token, displacement, next position
@@ -544,9 +652,7 @@ def get_address_intel(token_line, pos, vm):
 
     if pos >= len(token_line):
         raise InvalidMemLoc("")
-    reg = None
-    disp = 0
-    reg, disp, pos = get_expr_intel(token_line, pos, vm, reg)
+    reg, disp, pos = get_expr_intel(token_line, pos, vm, names)
     if pos >= len(token_line):
         raise MissingCloseBrack()
     elif isinstance(token_line[pos], CloseBracket):
@@ -555,7 +661,7 @@ def get_address_intel(token_line, pos, vm):
         raise InvalidMemLoc(token_line[pos].get_nm())
 
 
-def get_address_att(token_line, pos, vm, disp=0):
+def get_address_att(token_line, pos, vm, names, disp=0):
     """
     Converts a sublist of the tokenized instruction into
     corresponding address token for AT&T
@@ -564,6 +670,7 @@ def get_address_att(token_line, pos, vm, disp=0):
         token_line: List of instruction tokens
         pos: Beginning position in list
         vm: Virtual machine
+        names: Names of the program being parsed
         Disp: Numeric displacement
 
     Returns:
@@ -571,8 +678,7 @@ def get_address_att(token_line, pos, vm, disp=0):
     """
     if pos >= len(token_line):
         raise InvalidMemLoc("")
-    reg = None
-    reg, disp_list, pos = get_expr_att(token_line, pos, vm, reg, [None])
+    reg, disp_list, pos = get_expr_att(token_line, pos, vm, names)
     if pos >= len(token_line):
         raise MissingCloseParen()
     elif isinstance(token_line[pos], CloseParen):
@@ -586,7 +692,7 @@ def get_address_att(token_line, pos, vm, disp=0):
         raise InvalidMemLoc(token_line[pos].get_nm())
 
 
-def get_address_mips(token_line, pos, vm, disp=0):
+def get_address_mips(token_line, pos, vm, names, disp=0):
     """
     Converts a sublist of the tokenized instruction into
     corresponding address token for MIPS
@@ -595,6 +701,7 @@ def get_address_mips(token_line, pos, vm, disp=0):
         token_line: List of instruction tokens
         pos: Beginning position in list
         vm: Virtual machine
+        names: Names of the program being parsed
 
     Returns:
         Register token, displacement, next position
@@ -602,7 +709,7 @@ def get_address_mips(token_line, pos, vm, disp=0):
 
     if pos >= len(token_line):
         raise InvalidMemLoc("")
-    reg, pos = get_expr_mips(token_line, pos, vm)
+    reg, pos = get_expr_mips(token_line, pos, vm, names)
     if pos >= len(token_line):
         raise MissingCloseParen()
     elif isinstance(token_line[pos], CloseParen):
@@ -611,7 +718,7 @@ def get_address_mips(token_line, pos, vm, disp=0):
         raise InvalidMemLoc(token_line[pos].get_nm())
 
 
-def get_address_location(token_line, pos, vm):
+def get_address_location(token_line, pos, vm, names):
     """
     Retrieves address at current position in code
     Retrieves address by coding language
@@ -620,6 +727,7 @@ def get_address_location(token_line, pos, vm):
         token_line: List of the tokenized instruction
         pos: Beginning pos of list
         vm: Virtual machine
+        names: Names of the program being parsed
 
     Returns:
         RegAddress or Address token,
@@ -628,11 +736,11 @@ def get_address_location(token_line, pos, vm):
     reg = None
     disp = 0
     if vm.flavor == "intel":
-        reg, disp, pos = get_address_intel(token_line, pos, vm)
+        reg, disp, pos = get_address_intel(token_line, pos, vm, names)
     elif vm.flavor == "att":
-        reg, disp, pos = get_address_att(token_line, pos, vm)
+        reg, disp, pos = get_address_att(token_line, pos, vm, names)
     else:
-        reg, disp, pos = get_address_mips(token_line, pos, vm)
+        reg, disp, pos = get_address_mips(token_line, pos, vm, names)
     if reg:
         return (RegAddress(reg.get_nm(), vm,
                            disp, reg.get_multiplier()), pos)
@@ -659,10 +767,10 @@ def check_constant(token_line, pos):
                 not isinstance(token_line[pos + 1], IntegerTok)):
             return False
         if isinstance(token_line[pos + 1], IntegerTok):
-            token_line[pos + 1].con = True
+            token_line[pos + 1] = token_line[pos + 1].constant()
         else:
             try:
-                token_line[pos + 2].con = True
+                token_line[pos + 2] = token_line[pos + 2].constant()
             except Exception:
                 raise InvalidArgument("-")
         return True
@@ -670,7 +778,7 @@ def check_constant(token_line, pos):
         raise InvalidArgument("$")
 
 
-def get_op(token_line, pos, vm):
+def get_op(token_line, pos, vm, names):
     """
     Retrieves operand of instruction
 
@@ -678,6 +786,7 @@ def get_op(token_line, pos, vm):
         token_line: List of the tokenized instruction
         pos: Beginning pos of list
         vm: Virtual machine
+        names: Names of the program being parsed
 
     Returns:
         Operand token, position of next item in instruction
@@ -687,7 +796,7 @@ def get_op(token_line, pos, vm):
 
 # Register
     elif isinstance(token_line[pos], Register):
-        return register_token(token_line, pos, vm)
+        return register_token(token_line, pos, vm, names)
 
 # Floating Point Token
     elif isinstance(token_line[pos], FloatTok):
@@ -696,28 +805,29 @@ def get_op(token_line, pos, vm):
 # Constant Token
     elif isinstance(token_line[pos], ConstantSign):
         if vm.flavor == "att" and check_constant(token_line, pos):
-            return get_op(token_line, pos + 1, vm)
+            return get_op(token_line, pos + 1, vm, names)
         else:
             raise InvalidArgument("$")
 
 # Minus Token
     elif isinstance(token_line[pos], MinusTok):
         minus_token(token_line, pos)
-        return get_op(token_line, pos + 1, vm)
+        return get_op(token_line, pos + 1, vm, names)
 
 # Integer Token
     elif isinstance(token_line[pos], IntegerTok):
-        return number_token(token_line, pos, vm)
+        return number_token(token_line, pos, vm, names)
 
 # Symbol/Label Token
     elif isinstance(token_line[pos], NewSymbol):
         if vm.flavor == "wasm":
             return token_line[pos], pos + 1
         else:
-            if token_line[pos].get_nm() in vm.labels:
-                return (Label(token_line[pos].get_nm(), vm), pos + 1)
-            elif token_line[pos].get_nm() in vm.symbols:
-                return symbol_token(token_line, pos, vm)
+            label = names.label(token_line[pos].get_nm())
+            if label is not None:
+                return (Label(token_line[pos].get_nm(), vm, label), pos + 1)
+            elif names.is_symbol(token_line[pos].get_nm()):
+                return symbol_token(token_line, pos, vm, names)
             elif vm.flavor == 'intel' and token_line[pos].get_nm()[:2] == "ST":
                 return token_line[pos], pos + 1
             else:
@@ -725,12 +835,12 @@ def get_op(token_line, pos, vm):
 
 # Address Token
     elif is_start_address(token_line, pos, vm.flavor):
-        return get_address_location(token_line, pos + 1, vm)
+        return get_address_location(token_line, pos + 1, vm, names)
     else:
         raise InvalidArgument(token_line[pos].get_nm())
 
 
-def get_op_list(token_line, pos, vm, op_lst):
+def get_op_list(token_line, pos, vm, names, op_lst):
     """
     Returns a list of ops
 
@@ -738,20 +848,19 @@ def get_op_list(token_line, pos, vm, op_lst):
         token_line: Line of code
         pos: Starting position to retrieve op
         vm: Virtual machine
+        names: Names of the program being parsed
         op_lst: List of ops
 
     Returns:
         A list of ops, next position
     """
-    op, pos = get_op(token_line, pos, vm)
-    op_lst.append(op)
-    if pos >= len(token_line):
-        return op_lst, pos
-    else:
-
-        next_op = token_line[pos]
-        if isinstance(next_op, Comma):
-            return get_op_list(token_line, pos + 1, vm, op_lst)
+    while True:
+        op, pos = get_op(token_line, pos, vm, names)
+        op_lst.append(op)
+        if pos >= len(token_line):
+            return op_lst, pos
+        elif isinstance(token_line[pos], Comma):
+            pos += 1
         else:
             raise MissingComma()
 
@@ -775,13 +884,14 @@ def get_pc(token_line, pos):
         return token_line[pos]
 
 
-def parse_exec_unit(token_line, vm):
+def parse_exec_unit(token_line, vm, names):
     """
     Parses instruction
 
     Args:
         token_line: Tokenized instruction
         vm: Virtual machine
+        names: Names of the program being parsed
 
     Returns:
         List of tokens: instruction, operand(s)
@@ -804,7 +914,7 @@ def parse_exec_unit(token_line, vm):
 
     # retrieve ops
     if pos < len(token_line):
-        op_lst, pos = get_op_list(token_line, pos, vm, op_lst)
+        op_lst, pos = get_op_list(token_line, pos, vm, names, op_lst)
     token_instruction.extend(op_lst)
     # switch ops if flavor is AT&T
     if vm.flavor == 'att' and len(token_instruction) > 2:
@@ -815,24 +925,58 @@ def parse_exec_unit(token_line, vm):
     return token_instruction
 
 
-def parse(tok_lines, vm, web):
+def parse_exec_line(tokens, vm, names, parsed):
+    """
+    Parses an instruction, or takes it from the cache if we have
+    parsed the same line before and the names it uses still
+    mean the same.
+
+    Args:
+        tokens: Tokenized instruction and its source code
+        vm: Virtual machine
+        names: Names of the program being parsed
+        parsed: LineCache of parsed instructions
+
+    Returns:
+        List of tokens: instruction, operand(s)
     """
-    Parses the analysis obtained from lexical analysis
+    key = (vm.flavor, vm.base, tokens[1])
+    parsed_line = parsed.get(key, lambda line: line.matches(names))
+    if parsed_line is not None:
+        return list(parsed_line.unit)
+    line_names = LineNames(names)
+    parsed_unit = parse_exec_unit(tokens[0], vm, line_names)
+    parsed.put(key, ParsedLine(parsed_unit, line_names))
+    return parsed_unit
+
+
+def parse(tok_lines, vm, web, labels):
+    """
+    Parses the analysis obtained from lexical analysis.
+    Names the code doesn't define are looked up in vm,
+    but vm itself is left alone: load the returned Program to run it.
 
     Args:
-        tok_lines: Lines containing each line of code
+        tok_lines: Lines containing each line of code; any iterable
+                   of them will do, such as lex_lines() streaming a file
         vm: Virtual machine
         web: Boolean indicating whether source is from the website
              or from kernel
+        labels: Dictionary of the labels lex() found
 
     Returns:
-        A list of parsed instructions
+        A Program
     """
     parse_data = False
     parse_text = True
     token_instrs = []
     mem_loc = 0
     ip_init = None
+    resets = False
+    names = Names(vm, labels)
+    parsed = get_line_caches(vm).parsed
+    # the data section is only stored before we see any code:
+    data_image = []
     for tokens in tok_lines:
 
         if isinstance(tokens[0][TOKENS], Section):
@@ -840,8 +984,8 @@ def parse(tok_lines, vm, web):
                 parse_data = True
                 parse_text = False
                 if not web:
-                    vm.set_data_init("on")
-                    vm.re_init()
+                    resets = True
+                    names.reset_vm()
                 continue
             elif tokens[0][TOKENS].get_nm() == "text":
                 parse_text = True
@@ -850,14 +994,17 @@ def parse(tok_lines, vm, web):
             else:
                 raise InvalidSection(tokens[0][TOKENS].get_nm())
         if parse_data:
-            mem_loc = parse_data_token(tokens[0], vm, mem_loc)
+            if len(token_instrs) > 0:
+                mem_loc = parse_data_token(tokens[0], vm, names, mem_loc,
+                                           None)
+            else:
+                mem_loc = parse_data_token(tokens[0], vm, names, mem_loc,
+                                           data_image)
         elif parse_text:
-            vm.set_data_init("off")
-            parsed_unit = parse_exec_unit(tokens[0], vm)
+            parsed_unit = parse_exec_line(tokens, vm, names, parsed)
             token_instrs.append((parsed_unit, tokens[1]))
             if (vm.flavor == "mips_asm" or
                 vm.flavor == "mips_mml" or
                     vm.flavor == "riscv") and ip_init is None:
                 ip_init = token_instrs[0][TOKENS][0].get_val()
-                vm.start_ip = ip_init
-    return token_instrs
+    return Program(token_instrs, names, data_image, ip_init, resets)
@@ -0,0 +1,189 @@
+"""
+program.py: an assembled program, kept apart from the machine state,
+so the same program can be loaded into any machine.
+"""
+
+from collections import OrderedDict
+from types import MappingProxyType
+
+# the data image is a list of segments, each one of:
+# (DATA_BLOCK, memory location, step, values): values stored step apart
+# (DATA_FILL, memory location, step, count, value): value stored in
+#                                                   count cells
+DATA_BLOCK = 0
+DATA_FILL = 1
+
+
+class Names:
+    """
+    The label and symbol tables of a program being parsed.
+    Names the program doesn't define itself are looked up in the
+    machine's tables; what they resolved to is recorded, so we can
+    tell later whether the program still means the same thing on
+    some machine.
+    """
+    def __init__(self, vm, labels):
+        self.vm = vm
+        self.labels = labels
+        self.symbols = OrderedDict()
+        self.outside_labels = {}
+        self.outside_symbols = {}
+        # the kernels reset the machine when they see the data section:
+        self.use_vm = True
+
+    def label(self, name):
+        """
+        Returns the line number of label name, or None if there is
+        no such label.
+        """
+        if name in self.labels:
+            return self.labels[name]
+        elif not self.use_vm:
+            return None
+        value = self.vm.labels.get(name)
+        self.outside_labels[name] = value
+        return value
+
+    def symbol(self, name):
+        """
+        Returns the memory location of symbol name, or None if there is
+        no such symbol.
+        """
+        if name in self.symbols:
+            return self.symbols[name]
+        elif not self.use_vm:
+            return None
+        value = self.vm.symbols.get(name)
+        self.outside_symbols[name] = value
+        return value
+
+    def is_symbol(self, name):
+        return self.symbol(name) is not None
+
+    def define_symbol(self, name, mem_loc):
+        self.symbols[name] = mem_loc
+
+    def reset_vm(self):
+        self.use_vm = False
+
+
+class LineNames:
+    """
+    The names of a program as seen by one line being parsed:
+    lookups go to the program's Names, and are recorded, so we know
+    what the line depends on.
+    """
+    def __init__(self, names):
+        self.names = names
+        self.labels_used = {}
+        self.symbols_used = {}
+
+    def label(self, name):
+        value = self.names.label(name)
+        self.labels_used[name] = value
+        return value
+
+    def symbol(self, name):
+        value = self.names.symbol(name)
+        self.symbols_used[name] = value
+        return value
+
+    def is_symbol(self, name):
+        return self.symbol(name) is not None
+
+
+class Program:
+    """
+    What lex() and parse() make of the source code: the parsed
+    instructions, the label and symbol tables, and the initial
+    data image. A program is never changed once made;
+    load() puts it into a machine in one go.
+    """
+    def __init__(self, instrs, names, data, start_ip=None, resets=False):
+        """
+        Args:
+            instrs: List of (parsed instruction, source code) tuples
+            names: Names the program was parsed with
+            data: List of the data segments the data section
+                  stores when data initialization is on
+            start_ip: Address of the first instruction, for flavors
+                      whose instructions carry their own PC
+            resets: True if loading the program resets the machine
+        """
+        self.instrs = tuple((tuple(tokens), source)
+                            for (tokens, source) in instrs)
+        self.labels = MappingProxyType(dict(names.labels))
+        self.symbols = MappingProxyType(OrderedDict(names.symbols))
+        self.data = tuple(data)
+        self.start_ip = start_ip
+        self.resets = resets
+        self.outside_labels = MappingProxyType(dict(names.outside_labels))
+        self.outside_symbols = MappingProxyType(
+            dict(names.outside_symbols))
+        # the machine the instruction tokens are bound to:
+        self.vm = names.vm
+
+    def __len__(self):
+        return len(self.instrs)
+
+    def matches(self, vm):
+        """
+        Checks that the names the program took from the machine it
+        was parsed on mean the same on vm.
+
+        Args:
+            vm: Virtual machine
+
+        Returns:
+            True if the program can be loaded into vm as it is
+        """
+        if vm.flavor != self.vm.flavor or vm.base != self.vm.base:
+            return False
+        for name, value in self.outside_labels.items():
+            if vm.labels.get(name) != value:
+                return False
+        for name, value in self.outside_symbols.items():
+            if vm.symbols.get(name) != value:
+                return False
+        return True
+
+    def load(self, vm):
+        """
+        Puts the program's labels, symbols and data into vm.
+
+        Args:
+            vm: Virtual machine
+        """
+        if self.resets:
+            vm.set_data_init("on")
+            vm.re_init()
+        vm.labels.update(self.labels)
+        vm.index_labels()
+        vm.symbols.update(self.symbols)
+        if vm.get_data_init() == "on":
+            for segment in self.data:
+                if segment[0] == DATA_FILL:
+                    (kind, mem_loc, step, count, value) = segment
+                    vm.memory.fill(mem_loc, count, value, step)
+                else:
+                    (kind, mem_loc, step, values) = segment
+                    vm.memory.store_block(mem_loc, values, step)
+        if len(self.instrs) > 0:
+            vm.set_data_init("off")
+        if self.start_ip is not None:
+            vm.start_ip = self.start_ip
+
+    def bind(self, vm):
+        """
+        Returns the instructions with their operands bound to vm.
+
+        Args:
+            vm: Virtual machine
+
+        Returns:
+            List of (parsed instruction, source code) tuples
+        """
+        if vm is self.vm:
+            return self.instrs
+        return tuple((tuple(token.bind(vm) for token in tokens), source)
+                     for (tokens, source) in self.instrs)
@@ -0,0 +1,112 @@
+"""
+program_cache.py: a bounded LRU cache of assembled programs,
+so that stepping through a program doesn't re-assemble it each time.
+Programs don't belong to any machine, so the cache is shared by all.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from weakref import WeakKeyDictionary
+
+CACHE_SIZE = 32
+
+
+def program_key(code, flavor, base, web=True):
+    """
+    Returns the cache key for a program.
+
+    Args:
+        code: Source code
+        flavor: Assembly language
+        base: Number base
+        web: Boolean indicating whether source is from the website
+
+    Returns:
+        A hash of the code, flavor, base and source
+    """
+    # browsers send code with CRLF line endings; files read as text
+    # have LF ones: the same program should get the same key
+    code = code.replace("\r\n", "\n").replace("\r", "\n").rstrip()
+    digest = hashlib.sha1()
+    for part in (flavor, base, web, code):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class CachedProgram:
+    """
+    A Program, along with what we work out from it before running it:
+    the MIPS bit code, and the decoded instructions for each machine
+    that has run it. Machines of many sessions may share it,
+    hence the lock.
+    """
+    def __init__(self, program, bit_code=''):
+        self.program = program
+        self.bit_code = bit_code
+        self.decoded = WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+    def get_decoded(self, vm, decode):
+        """
+        Returns the program decoded for vm.
+
+        Args:
+            vm: Virtual machine
+            decode: Function that decodes parsed instructions for vm
+        """
+        with self.lock:
+            decoded = self.decoded.get(vm)
+        if decoded is None:
+            # only vm's session decodes for vm, so this needn't be locked:
+            decoded = decode(self.program.bind(vm), vm)
+            with self.lock:
+                self.decoded[vm] = decoded
+        return decoded
+
+
+class ProgramCache:
+    """
+    A least-recently-used cache of CachedPrograms.
+    It is shared by the threads serving the website, hence the lock.
+    """
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.programs = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.programs)
+
+    def get(self, key, vm):
+        """
+        Returns the cached program for key if it can be loaded into vm,
+        None otherwise.
+        """
+        with self.lock:
+            cached = self.programs.get(key)
+            if cached is None or not cached.program.matches(vm):
+                self.misses += 1
+                return None
+            self.programs.move_to_end(key)
+            self.hits += 1
+            return cached
+
+    def put(self, key, cached):
+        with self.lock:
+            self.programs[key] = cached
+            self.programs.move_to_end(key)
+            while len(self.programs) > self.size:
+                self.programs.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.programs.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+program_cache = ProgramCache()
@@ -0,0 +1,124 @@
+"""
+registers.py: the register file of our virtual machines.
+"""
+
+from collections.abc import MutableMapping
+
+
+class RegisterStack:
+    """
+    A stack of registers, such as the x87's ST0..ST7. As in the x87,
+    the registers form a ring, and top is the one ST0 names:
+    pushing and popping move top rather than the values,
+    and STi is the register i places past top.
+    """
+    def __init__(self, names, value):
+        """
+        Args:
+            names: Names of the registers, from the top of the stack
+            value: Initial value of the registers
+        """
+        self.names = names
+        self.size = len(names)
+        self.cells = [value] * self.size
+        self.top = 0
+
+    def get(self, i):
+        return self.cells[(self.top + i) % self.size]
+
+    def set(self, i, value):
+        self.cells[(self.top + i) % self.size] = value
+
+    def push(self, value):
+        self.top = (self.top - 1) % self.size
+        self.cells[self.top] = value
+
+    def pop(self, empty_val):
+        """
+        Returns the value on top, leaving empty_val in its register.
+        """
+        value = self.cells[self.top]
+        self.cells[self.top] = empty_val
+        self.top = (self.top + 1) % self.size
+        return value
+
+    def reset(self, value):
+        for i in range(self.size):
+            self.cells[i] = value
+        self.top = 0
+
+
+class RegisterFile(MutableMapping):
+    """
+    Register values, kept in a list with a slot for each register.
+    Register tokens look their slot up once, when they are made,
+    so reading a register while running is a single index.
+    The registers of a RegisterStack, if the machine has one,
+    are looked up from the top of the stack instead.
+
+    Everywhere else the register file works as the ordered
+    dictionary of (name, value) it is made from.
+    """
+    def __init__(self, regs, stack=None):
+        """
+        Args:
+            regs: List of (register name, initial value) pairs
+            stack: RegisterStack holding some of those registers
+        """
+        self.slots = {}
+        self.cells = []
+        self.names = []
+        self.stack = stack
+        self.stack_slots = {}
+        if stack is not None:
+            for i, name in enumerate(stack.names):
+                self.stack_slots[name] = i
+        for name, value in regs:
+            if name in self.stack_slots:
+                self.names.append(name)
+            self[name] = value
+
+    def slot(self, name):
+        """
+        Returns the slot of register name in cells.
+        """
+        return self.slots[name]
+
+    def stack_slot(self, name):
+        """
+        Returns the place of register name from the top of the stack,
+        or None if it isn't on the stack.
+        """
+        return self.stack_slots.get(name)
+
+    def __getitem__(self, name):
+        slot = self.slots.get(name)
+        if slot is None:
+            return self.stack.get(self.stack_slots[name])
+        return self.cells[slot]
+
+    def __setitem__(self, name, value):
+        slot = self.slots.get(name)
+        if slot is not None:
+            self.cells[slot] = value
+        elif name in self.stack_slots:
+            self.stack.set(self.stack_slots[name], value)
+        else:
+            self.slots[name] = len(self.cells)
+            self.names.append(name)
+            self.cells.append(value)
+
+    def __delitem__(self, name):
+        raise KeyError(name)
+
+    def __contains__(self, name):
+        return name in self.slots or name in self.stack_slots
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __str__(self):
+        return str(dict(self.items()))
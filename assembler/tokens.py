@@ -6,6 +6,7 @@ tokens.py: contains classes we tokenize into.
 import struct
 import binascii
 import sys
+from copy import copy
 
 from abc import abstractmethod
 
@@ -13,6 +14,8 @@ from .errors import InvalidMemLoc, RegUnwritable, IntOutOfRng
 from .errors import UnknownName, InvalidArgument
 from .errors import NotSettable, UnknownLabel, LabelNotSettable
 from .errors import TooBigForSingle, TooBigForDouble
+from .memory import hex_addr
+from .trace import DEBUG
 
 BITS = 32   # we are on a 32-bit machine
 MAX_INT = (2**(BITS-1)) - 1
@@ -25,10 +28,6 @@ VALS = 0
 MEM_LOC = 1
 
 
-def add_debug(s, vm):
-    vm.debug += (s + "\n")
-
-
 # 32 bits
 def float_to_hex(f):
     return hex(struct.unpack('<I', struct.pack('<f', f))[0])
@@ -63,6 +62,8 @@ def b_to_f64(value):
 
 
 class Token:
+    __slots__ = ('name', 'value')
+
     def __init__(self, name, val=0):
         self.name = name
         self.value = val
@@ -79,38 +80,59 @@ class Token:
     def get_nm(self):
         return self.name
 
+    def bind(self, vm):
+        """
+        Returns this token as it would be for machine vm.
+        Most tokens don't refer to a machine, so are the same on all.
+        """
+        return self
+
 
 class Section(Token):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name)
 
 
 class OpenBracket(Token):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("[")
 
 
 class CloseBracket(Token):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("]")
 
 
 class OpenParen(Token):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("(")
 
 
 class CloseParen(Token):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(")")
 
 
 class DataType(Token):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name)
 
 
 class Comma(Token):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(",")
 
@@ -120,6 +142,8 @@ class ConstantSign(Token):
     Class used to differentiate between
     a constant and an offset
     """
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("$")
 
@@ -128,6 +152,8 @@ class Instruction(Token):
     """
     Class representing all instructions.
     """
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name)
 
@@ -146,11 +172,20 @@ class Operand(Token):
     """
     Superclass of all operands.
     """
+    __slots__ = ()
+
     def __init__(self, name, val=0):
         super().__init__(name, val)
 
 
 class IntegerTok(Operand):
+    """
+    An integer. Small ones are shared (see int_tok()),
+    so an IntegerTok is never changed once made:
+    negated() and constant() return new tokens.
+    """
+    __slots__ = ('con',)
+
     def __init__(self, val=0, con=True):
         if(val > MAX_INT or val < MIN_INT):
             raise IntOutOfRng(str(val))
@@ -164,11 +199,36 @@ class IntegerTok(Operand):
     def get_val(self):
         return self.value
 
-    def negate_val(self):
-        self.value *= -1
+    def negated(self):
+        return int_tok(-self.value, self.con)
+
+    def constant(self):
+        return int_tok(self.value, True)
+
+
+SMALL_INT_MIN = -256
+SMALL_INT_MAX = 1024
+small_ints = {}
+
+
+def int_tok(val, con=True):
+    """
+    Returns an IntegerTok for val.
+    Programs use the same small numbers over and over,
+    so those tokens are made once and shared.
+    """
+    if SMALL_INT_MIN <= val <= SMALL_INT_MAX:
+        token = small_ints.get((val, con))
+        if token is None:
+            token = IntegerTok(val, con)
+            small_ints[(val, con)] = token
+        return token
+    return IntegerTok(val, con)
 
 
 class FloatTok(Operand):
+    __slots__ = ('data_type',)
+
     def __init__(self, data_type=".float", val=0.0):
         self.data_type = data_type
         # do a bit of error checking for precision for the hex value
@@ -224,26 +284,36 @@ class FloatTok(Operand):
 
 
 class StringTok(Token):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name)
 
 
 class DupTok(Token):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("DUP")
 
 
 class QuestionTok(Token):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("?")
 
 
 class PlusTok(Token):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("+")
 
 
 class MinusTok(Token):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("-")
 
@@ -253,79 +323,193 @@ class Location(Operand):
     Class to give common type to memory and registers.
     Adds set_val(), not possible for ints!
     """
+    __slots__ = ('vm',)
+
     def __init__(self, name, vm, val=0):
         super().__init__(name, val)
         self.vm = vm
 
+    def attach(self, vm):
+        self.vm = vm
+
+    def bind(self, vm):
+        if vm is self.vm:
+            return self
+        token = copy(self)
+        token.attach(vm)
+        return token
+
     @abstractmethod
     def set_val(self, val):
         pass
 
 
 class Address(Location):
+    """
+    A memory location. The name is the address as we show it,
+    in hex; the integer address is worked out once, here.
+    """
+    __slots__ = ('mem', 'addr')
+
     def __init__(self, name, vm, val=0):
         super().__init__(name, vm, val)
         self.mem = vm.memory
+        self.addr = int(name, 16)
+
+    def attach(self, vm):
+        super().attach(vm)
+        self.mem = vm.memory
 
     def __str__(self):
         return "[" + str(self.name) + "]"
 
     def get_val(self):
-        if self.name in self.mem:
-            if "." in str(self.mem[self.name]):
-                return float(self.mem[self.name])
-            return int(self.mem[self.name])
-        else:
-            return 0
+        value = self.mem.load(self.get_addr())
+        if type(value) is int:
+            return value
+        if "." in str(value):
+            return float(value)
+        return int(value)
 
     def set_val(self, val):
-        self.mem[self.name] = val
+        self.mem.store(self.get_addr(), val)
+
+    def get_addr(self):
+        return self.addr
 
     def get_mem_addr(self):
         return self.name
 
 
+def compile_addr(cells, slot, multiplier, terms, disp):
+    """
+    Makes a function that works out an effective address: the value
+    of the register in cells[slot] times multiplier, plus the
+    registers in terms, plus disp. Common shapes of address get a
+    function of their own, so working one out is a single call.
+
+    Args:
+        cells: Register values the base register lives in
+        slot: Slot of the base register in cells
+        multiplier: Scale of the base register
+        terms: List of (cells, slot, multiplier) of index registers
+        disp: Constant displacement
+
+    Returns:
+        Function of no arguments returning the integer address
+    """
+    def checked(addr_val):
+        if addr_val < 0:
+            raise InvalidMemLoc(str(addr_val))
+        return addr_val
+
+    if not terms:
+        if multiplier == 1:
+            def get_addr():
+                addr_val = int(cells[slot]) + disp
+                if addr_val < 0:
+                    return checked(addr_val)
+                return addr_val
+        else:
+            def get_addr():
+                addr_val = int(cells[slot]) * multiplier + disp
+                if addr_val < 0:
+                    return checked(addr_val)
+                return addr_val
+    elif len(terms) == 1:
+        ((index_cells, index_slot, scale),) = terms
+
+        def get_addr():
+            addr_val = (int(cells[slot]) * multiplier
+                        + int(index_cells[index_slot]) * scale + disp)
+            if addr_val < 0:
+                return checked(addr_val)
+            return addr_val
+    else:
+        terms = tuple(terms)
+
+        def get_addr():
+            addr_val = int(cells[slot]) * multiplier + disp
+            for (index_cells, index_slot, scale) in terms:
+                addr_val += int(index_cells[index_slot]) * scale
+            if addr_val < 0:
+                return checked(addr_val)
+            return addr_val
+    return get_addr
+
+
 class RegAddress(Address):
+    """
+    A memory location held in a register. The name is the register's,
+    and the address is worked out from it on each access,
+    by a function made for the shape of the address
+    when the token is bound to a machine.
+    """
+    __slots__ = ('regs', 'displacement', 'multiplier', 'eff_addr')
+
     def __init__(self, name, vm, displacement=0, multiplier=1, val=0):
-        super().__init__(name, vm, val)
+        Location.__init__(self, name, vm, val)
+        self.mem = vm.memory
         self.regs = vm.registers
         self.displacement = displacement
         self.multiplier = multiplier
+        self.compile()
 
-    def get_mem_addr(self):
-        # right now, memory addresses are strings. eeh!
-        address = hex(int(self.regs[self.name]) *
-                      self.multiplier).split('x')[-1].upper()
+    def attach(self, vm):
+        super().attach(vm)
+        self.regs = vm.registers
+        if isinstance(self.displacement, list):
+            self.displacement = [disp_item.bind(vm)
+                                 if isinstance(disp_item, Register)
+                                 else disp_item
+                                 for disp_item in self.displacement]
+        elif isinstance(self.displacement, Register):
+            self.displacement = self.displacement.bind(vm)
+        self.compile()
+
+    def compile(self):
+        """
+        Makes eff_addr, the function working out our address.
+        """
+        terms = []
         disp = 0
         if isinstance(self.displacement, list):
             for disp_item in self.displacement:
                 if isinstance(disp_item, Register):
-                    disp += disp_item.get_val() * disp_item.get_multiplier()
+                    terms.append((disp_item.cells, disp_item.slot,
+                                  disp_item.get_multiplier()))
                 else:
                     disp += disp_item
         elif isinstance(self.displacement, Register):
-            disp = self.displacement.get_val()
-        elif self.displacement != 0:
+            terms.append((self.displacement.cells,
+                          self.displacement.slot, 1))
+        else:
             disp = self.displacement
-        addr_val = int(self.regs[self.name]) * self.multiplier + disp
-        if addr_val < 0:
-            raise InvalidMemLoc(str(addr_val))
-        address = hex(addr_val).split('x')[-1].upper()
-        return address
+        self.eff_addr = compile_addr(self.regs.cells,
+                                     self.regs.slot(self.name),
+                                     self.multiplier, terms, disp)
+
+    def get_addr(self):
+        return self.eff_addr()
+
+    def get_mem_addr(self):
+        return hex_addr(self.eff_addr())
 
     def get_val(self):
-        mem_addr = self.get_mem_addr()
-        if mem_addr in self.mem:
-            return self.mem[str(mem_addr)]
-        else:
-            return 0
+        return self.mem.load(self.eff_addr())
 
     def set_val(self, val):
-        mem_addr = self.get_mem_addr()
-        self.mem[str(mem_addr)] = val
+        self.mem.store(self.eff_addr(), val)
 
 
 class Register(Location):
+    """
+    A register. Its slot in the register file, and whether it
+    holds floats, are worked out when the token is made.
+    """
+    __slots__ = ('registers', 'slot', 'cells', 'is_float', 'multiplier',
+                 'writable', 'val')
+
     def __init__(self, name, vm, val=0):
         super().__init__(name, vm, val)
         # isFloat = False
@@ -339,24 +523,33 @@ class Register(Location):
         # #     print("registers changed")
         # else:
         #     self.registers = vm.registers
-        self.registers = vm.registers
-        self.val = self.registers[self.name]
-        self.writable = True
+        self.is_float = (self.name[:2].upper() == "ST" or
+                         self.name[0].upper() == "F")
         self.multiplier = 1
-        if self.name in vm.unwritable:
-            self.writable = False
+        self.attach(vm)
+        self.val = self.cells[self.slot]
+
+    def attach(self, vm):
+        super().attach(vm)
+        self.registers = vm.registers
+        self.slot = self.registers.slot(self.name)
+        self.cells = self.registers.cells
+        self.writable = self.name not in vm.unwritable
 
     def __str__(self):
         return str(self.name)
 
     def get_val(self):
-        if self.name[:2].upper() == "ST" or self.name[0].upper() == "F":
-            return float(self.registers[self.name])
-        return int(self.registers[self.name])
+        value = self.cells[self.slot]
+        if self.is_float:
+            return float(value)
+        if type(value) is int:
+            return value
+        return int(value)
 
     def set_val(self, val):
         if self.writable:
-            self.registers[self.name] = val
+            self.cells[self.slot] = val
         else:
             raise RegUnwritable(self.name)
 
@@ -372,27 +565,67 @@ class Register(Location):
         self.val *= -1
 
 
+class StackRegister(Register):
+    """
+    A register on the machine's register stack, such as the x87's
+    ST(i): its slot is its place from the top of the stack,
+    so it names whatever register is i places past top.
+    """
+    __slots__ = ('stack',)
+
+    def attach(self, vm):
+        Location.attach(self, vm)
+        self.registers = vm.registers
+        self.stack = self.registers.stack
+        self.slot = self.registers.stack_slot(self.name)
+        self.cells = self.stack.cells
+        self.writable = self.name not in vm.unwritable
+
+    def get_val(self):
+        return float(self.stack.get(self.slot))
+
+    def set_val(self, val):
+        if self.writable:
+            self.stack.set(self.slot, val)
+        else:
+            raise RegUnwritable(self.name)
+
+
+def make_register(name, vm):
+    """
+    Returns a token for register name of vm.
+    """
+    if vm.registers.stack_slot(name) is not None:
+        return StackRegister(name, vm)
+    return Register(name, vm)
+
+
 class Label(Location):
     """
     Class to hold labels for jumps.
+    The label's line number is bound when the token is made,
+    so a jump doesn't need to look the label up.
+    If no line number is given, it is looked up in the machine's labels.
     """
-    def __init__(self, name, vm, val=0):
+    __slots__ = ()
+
+    def __init__(self, name, vm, val=None):
         super().__init__(name, vm, val)
-        self.labels = vm.labels
-        if self.name not in self.labels and val != 0:
-            self.labels[self.name] = val
+        if val is None:
+            self.value = vm.labels.get(self.name)
 
     def get_val(self):
-        if self.name not in self.labels:
+        if self.value is None:
             raise UnknownLabel(self.name)
-        else:
-            return self.labels[self.name]
+        return self.value
 
     def set_val(self, val):
         raise LabelNotSettable(self.name)
 
 
 class NewSymbol(Token):
+    __slots__ = ('val',)
+
     def __init__(self, name, index=None):
         super().__init__(name)
         self.val = 0
@@ -408,10 +641,11 @@ class Symbol(Location):
     """
     Class to hold symbols such as variable names.
     """
+    __slots__ = ()
+
     def __init__(self, name, vm):
         super().__init__(name, vm)
         self.vm = vm
-        self.check_nm()
 
     def check_nm(self):
         if self.name not in self.vm.symbols:
@@ -423,7 +657,8 @@ class Symbol(Location):
 
     def get_val(self):
         self.check_nm()
-        add_debug("Symbol " + self.name + " = "
-                  + str(self.vm.symbols[self.name]),
-                  self.vm)
+        trace = self.vm.trace
+        if trace.level >= DEBUG:
+            trace.log(DEBUG, "Symbol " + self.name + " = "
+                      + str(self.vm.symbols[self.name]))
         return self.vm.symbols[self.name]
@@ -0,0 +1,60 @@
+"""
+trace.py: the debugging trace of our virtual machines,
+which the website shows under the program.
+"""
+
+from collections import deque
+
+# trace levels: a message is kept if its level is at or below the trace's
+OFF = 0
+INFO = 1      # once per run or per request
+DEBUG = 2     # as instructions run, such as each symbol read
+
+TRACE_SIZE = 1000
+
+
+class Trace:
+    """
+    The last size messages logged at the trace's level or below.
+    Code on a hot path checks the level before building its message:
+
+        if vm.trace.level >= DEBUG:
+            vm.trace.log(DEBUG, "Symbol " + name + ...)
+
+    so a trace that is off costs it one comparison.
+    """
+    def __init__(self, level=INFO, size=TRACE_SIZE):
+        self.level = level
+        self.entries = deque(maxlen=size)
+
+    def enabled(self, level):
+        return level <= self.level
+
+    def log(self, level, msg):
+        if level <= self.level:
+            self.entries.append(msg)
+
+    def last(self, count=None):
+        """
+        Returns the last count messages, oldest first,
+        or all of them if count is None.
+        """
+        if count is None or count >= len(self.entries):
+            return list(self.entries)
+        return list(self.entries)[len(self.entries) - count:]
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        return "".join(msg + "\n" for msg in self.entries)
+
+
+def add_debug(s, vm, level=INFO):
+    """
+    Logs s to vm's trace.
+    """
+    vm.trace.log(level, s)
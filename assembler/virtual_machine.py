@@ -4,7 +4,12 @@ Our x86 virtual machine representation.
 
 from collections import OrderedDict
 
+from .changes import ChangeJournal
 from .errors import StackOverflow, StackUnderflow
+from .flags import LazyFlags
+from .memory import Memory, PagedMemory, Stack
+from .registers import RegisterFile, RegisterStack
+from .trace import Trace
 
 MEM_DIGITS = 2
 
@@ -34,19 +39,38 @@ class VirtualMachine:
     Holds the memory, registers, flags, etc. that our assembly code
     will use. A singleton class.
     """
-    def __init__(self):
+    # how far apart the stack cells we show are:
+    stack_step = 1
+
+    def __init__(self, mem_size=MEM_SIZE, stack_size=None):
+        """
+        Args:
+            mem_size: Number of memory cells below the stack; this
+                      only places the stack, as memory is not bounded
+            stack_size: Number of stack cells, which sit just past
+                        memory; as many as there are memory cells
+                        if None
+        """
         # the x86 registers
         self.nxt_key = 0
         self.ret_str = "GIRONAGIRONAGETSGETS"
-        self.debug = ""
+        self.trace = Trace()
 
-        self.memory = OrderedDict()
+        if stack_size is None:
+            stack_size = mem_size
+        self.mem_size = mem_size
+        self.stack_bottom = mem_size
+        self.stack_top = mem_size + stack_size - 1
+
+        self.memory = Memory()
         self.mem_init()
 
-        self.stack = OrderedDict()
+        self.stack = Stack(self.stack_bottom, self.stack_top,
+                           self.stack_step, EMPTY_CELL)
         self.stack_init()
 
         self.labels = {}
+        self.ip_labels = {}
         self.labels_init()
 
         self.symbols = OrderedDict()
@@ -59,7 +83,7 @@ class VirtualMachine:
         self.data_init = "on"
         self.start_ip = 0
         self.ip_div = 1
-        self.changes = set()
+        self.changes = ChangeJournal()
         self.base = None
         self.stack_change = ""
         self.next_stack_change = ""
@@ -71,6 +95,19 @@ class VirtualMachine:
                 + "Stack: " + str(self.stack) + "\n"
                 + "Labels: " + str(self.labels))
 
+    @property
+    def debug(self):
+        """
+        The trace, as the text the website shows.
+        """
+        return str(self.trace)
+
+    @debug.setter
+    def debug(self, text):
+        self.trace.clear()
+        for msg in text.splitlines():
+            self.trace.log(self.trace.level, msg)
+
     def get_ip_div(self):
         return self.ip_div
 
@@ -106,23 +143,23 @@ class VirtualMachine:
 
     def labels_init(self):
         self.labels.clear()
+        self.ip_labels.clear()
+
+    def index_labels(self):
+        """
+        Builds the reverse (ip -> label) map from the label table,
+        so exec() can spot a label entry with one lookup.
+        """
+        self.ip_labels.clear()
+        for label, ip in self.labels.items():
+            self.ip_labels[ip] = label
+
+    def stack_init(self):
+        self.stack.clear()
 
     def cstack_init(self):
         del self.c_stack[:]
 
-    def order_mem(self):
-        lst = []
-        for key in self.memory:
-            lst.append(key)
-        for hex_key in range(0, len(lst)):
-            lst[hex_key] = int(lst[hex_key], 16)
-        lst.sort()
-        sorted_mem = OrderedDict()
-        for decimal_key in lst:
-            hex_sorted_key = hex(decimal_key).split('x')[-1].upper()
-            sorted_mem[hex_sorted_key] = self.memory[hex_sorted_key]
-        self.memory = sorted_mem
-
     def empty_cell(self):
         return EMPTY_CELL
 
@@ -134,12 +171,21 @@ class VirtualMachine:
 
 
 class IntelMachine(VirtualMachine):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, mem_size=MEM_SIZE, stack_size=None):
+        """
+        Args:
+            mem_size: Where the stack starts: programs may still
+                      use memory cells past it
+            stack_size: Number of stack cells; as many as mem_size
+                        if None
+        """
+        super().__init__(mem_size, stack_size)
 
         self.float_stack_bottom = -1
+        self.float_stack = RegisterStack(
+            [f'ST{i}' for i in range(FLOAT_STACK_LIMIT)], 0.0)
 
-        self.registers = OrderedDict(
+        self.registers = RegisterFile(
                     [
                         ('EAX', 0),
                         ('EBX', 0),
@@ -147,7 +193,7 @@ class IntelMachine(VirtualMachine):
                         ('EDX', 0),
                         ('ESI', 0),
                         ('EDI', 0),
-                        (STACK_PTR_INTEL, STACK_TOP),
+                        (STACK_PTR_INTEL, self.stack_top),
                         ('EBP', 0),
                         (INSTR_PTR_INTEL, 0),
                         ('ST0', 0.0),
@@ -158,18 +204,12 @@ class IntelMachine(VirtualMachine):
                         ('ST5', 0.0),
                         ('ST6', 0.0),
                         ('ST7', 0.0),
-                    ])
+                    ], self.float_stack)
 
         self.unwritable = [INSTR_PTR_INTEL, STACK_PTR_INTEL]
 
         # for now we only need four of the flags
-        self.flags = OrderedDict(
-                    [
-                        ('CF', 0),
-                        ('OF', 0),
-                        ('SF', 0),
-                        ('ZF', 0),
-                    ])
+        self.flags = LazyFlags(['CF', 'OF', 'SF', 'ZF'], self.changes)
 
     def is_FP_stack_empty(self):
         return self.float_stack_bottom == -1
@@ -178,14 +218,9 @@ class IntelMachine(VirtualMachine):
         return self.float_stack_bottom == FLOAT_STACK_LIMIT - 1
 
     def push_to_Float_Stack(self, val):
-        if self.float_stack_bottom == -1:
-            self.registers["ST0"] = val
-        else:
-            for i in range(self.float_stack_bottom + 1, 0, -1):
-                self.registers[f'ST{i}'] = self.registers[f'ST{i - 1}']
-            self.registers["ST0"] = val
+        self.float_stack.push(val)
         self.float_stack_bottom += 1
-        self.changes.add('ST0')
+        self.changes.add_register('ST0')
 
     def get_register_at_float_stack_top(self):
         return "ST"+str(self.float_stack_top)
@@ -194,12 +229,8 @@ class IntelMachine(VirtualMachine):
         return "ST" + str((self.float_stack_top + k) % FLOAT_STACK_LIMIT)
 
     def pop_from_Float_Stack(self):
-        curr_value_float_stack_top = self.registers['ST0']
-        for i in range(0, self.float_stack_bottom):
-            self.registers[f'ST{i}'] = self.registers[f'ST{i + 1}']
-        self.registers[f'ST{self.float_stack_bottom}'] = 0.0
         self.float_stack_bottom -= 1
-        return curr_value_float_stack_top
+        return self.float_stack.pop(0.0)
 
     def get_next_register(self):
         self.float_stack_top = (self.float_stack_top - 1) % FLOAT_STACK_LIMIT
@@ -207,17 +238,12 @@ class IntelMachine(VirtualMachine):
 
     def reset_FP_Stack(self):
         self.float_stack_bottom = -1
-        for i in range(FLOAT_STACK_LIMIT):
-            self.registers["ST"+str(i)] = 0.0
+        self.float_stack.reset(0.0)
 
     def re_init(self):
         super().re_init()
         self.reset_FP_Stack()
-        self.registers[STACK_PTR_INTEL] = STACK_TOP
-
-    def stack_init(self):
-        for i in range(STACK_TOP, STACK_BOTTOM - 1, -1):
-            self.stack[hex(i).split('x')[-1].upper()] = 0
+        self.registers[STACK_PTR_INTEL] = self.stack_top
 
     def inc_ip(self):
         ip = self.get_ip()
@@ -241,9 +267,9 @@ class IntelMachine(VirtualMachine):
         self.set_sp(sp)
 
     def set_sp(self, val):
-        if val < STACK_BOTTOM - 1:
+        if val < self.stack_bottom - 1:
             raise StackOverflow()
-        if val > STACK_TOP:
+        if val > self.stack_top:
             raise StackUnderflow()
 
         self.registers[STACK_PTR_INTEL] = val
@@ -257,13 +283,16 @@ class MIPSMachine(VirtualMachine):
     Create a VM for running MIPS assembler.
     Why isn't flavor set here?
     """
-    def __init__(self):
-        super().__init__()
+    stack_step = 4
+
+    def __init__(self, mem_size=MEM_SIZE, stack_size=None):
+        super().__init__(mem_size, stack_size)
         self.ip_div = 4
         self.init_ip = MIPS_START_IP
+        self.memory = PagedMemory()
         self.unwritable = [INSTR_PTR_MIPS, 'R0', 'F0', 'F29',
                            STACK_PTR_MIPS, 'HI', 'LO']
-        self.registers = OrderedDict(
+        self.registers = RegisterFile(
                     [
                         ('R0', 0),
                         ('R12', 0),
@@ -341,13 +370,9 @@ class MIPSMachine(VirtualMachine):
 
     def re_init(self):
         super().re_init()
-        self.registers[STACK_PTR_MIPS] = STACK_TOP
+        self.registers[STACK_PTR_MIPS] = self.stack_top
         self.changes.clear()
 
-    def stack_init(self):
-        for i in range(STACK_TOP - 3, STACK_BOTTOM - 1, -4):
-            self.stack[hex(i).split('x')[-1].upper()] = 0
-
     def inc_ip(self):
         ip = self.get_ip()
         ip += 4
@@ -370,9 +395,9 @@ class MIPSMachine(VirtualMachine):
         self.set_sp(sp)
 
     def set_sp(self, val):
-        if val < STACK_BOTTOM - 1:
+        if val < self.stack_bottom - 1:
             raise StackOverflow()
-        if val > STACK_TOP:
+        if val > self.stack_top:
             raise StackUnderflow()
 
         self.registers[STACK_PTR_MIPS] = val
@@ -383,13 +408,15 @@ class MIPSMachine(VirtualMachine):
 
 class RISCVMachine(VirtualMachine):
     # make sure to account for the lack of HI and LO in display
+    stack_step = 4
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, mem_size=MEM_SIZE, stack_size=None):
+        super().__init__(mem_size, stack_size)
         self.ip_div = 4
         self.init_ip = RISC_START_IP
+        self.memory = PagedMemory()
         self.unwritable = [INSTR_PTR_RISCV, 'X0', STACK_PTR_RISCV]
-        self.registers = OrderedDict(
+        self.registers = RegisterFile(
                         [
                             ('X0', 0),
                             ('X11', 0),
@@ -432,13 +459,9 @@ class RISCVMachine(VirtualMachine):
 
     def re_init(self):
         super().re_init()
-        self.registers[STACK_PTR_RISCV] = STACK_TOP
+        self.registers[STACK_PTR_RISCV] = self.stack_top
         self.changes.clear()
 
-    def stack_init(self):
-        for i in range(STACK_TOP - 3, STACK_BOTTOM - 1, -4):
-            self.stack[hex(i).split('x')[-1].upper()] = 0
-
     def inc_ip(self):
         ip = self.get_ip()
         ip += 4
@@ -461,9 +484,9 @@ class RISCVMachine(VirtualMachine):
         self.set_sp(sp)
 
     def set_sp(self, val):
-        if val < STACK_BOTTOM - 1:
+        if val < self.stack_bottom - 1:
             raise StackOverflow()
-        if val > STACK_TOP:
+        if val > self.stack_top:
             raise StackUnderflow()
 
         self.registers[STACK_PTR_RISCV] = val
@@ -473,15 +496,17 @@ class RISCVMachine(VirtualMachine):
 
 
 class WASMMachine(VirtualMachine):
-    def __init__(self):
-        super().__init__()
+    stack_step = 4
+
+    def __init__(self, mem_size=MEM_SIZE, stack_size=None):
+        super().__init__(mem_size, stack_size)
         self.locals = OrderedDict()
         self.locals_init()
 
         self.globals = OrderedDict()
         self.globals_init()
 
-        self.stack_ptr = STACK_BOTTOM
+        self.stack_ptr = self.stack_bottom
         self.ip = 0
 
     def re_init(self):
@@ -498,7 +523,7 @@ class WASMMachine(VirtualMachine):
         self.globals_init()
         self.stack_change = ""
         self.next_stack_change = ""
-        self.stack_ptr = STACK_BOTTOM
+        self.stack_ptr = self.stack_bottom
 
     def locals_init(self):
         self.locals.clear()
@@ -506,10 +531,6 @@ class WASMMachine(VirtualMachine):
     def globals_init(self):
         self.globals.clear()
 
-    def stack_init(self):
-        for i in range(STACK_TOP - 3, STACK_BOTTOM - 1, -4):
-            self.stack[hex(i).split('x')[-1].upper()] = 0
-
     def inc_sp(self):
         sp = self.get_sp()
         sp += 4
@@ -521,9 +542,9 @@ class WASMMachine(VirtualMachine):
         self.set_sp(sp)
 
     def set_sp(self, val):
-        if val < STACK_BOTTOM - 1:
+        if val < self.stack_bottom - 1:
             raise StackOverflow()
-        if val > STACK_TOP:
+        if val > self.stack_top:
             raise StackUnderflow()
 
         self.stack_ptr = val
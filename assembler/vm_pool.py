@@ -0,0 +1,95 @@
+"""
+vm_pool.py: a pool of virtual machines, a set for each user session,
+so users of the website don't share (and overwrite) machines,
+and requests can be served by many threads at once.
+"""
+
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from .virtual_machine import IntelMachine, MIPSMachine, RISCVMachine
+from .virtual_machine import WASMMachine
+
+POOL_SIZE = 64
+IDLE_TIMEOUT = 30 * 60    # seconds
+
+
+class Machines:
+    """
+    The machines of one session, and a lock a request holds
+    while it uses them.
+    """
+    def __init__(self):
+        self.intel_machine = IntelMachine()
+        self.mips_machine = MIPSMachine()
+        self.riscv_machine = RISCVMachine()
+        self.wasm_machine = WASMMachine()
+        self.lock = threading.Lock()
+        self.last_used = 0
+
+    def all(self):
+        return (self.intel_machine, self.mips_machine,
+                self.riscv_machine, self.wasm_machine)
+
+
+class VMPool:
+    """
+    A least-recently-used pool of Machines, keyed by session.
+    When the pool is full, the least recently used session's machines
+    are dropped; so are those of any session idle for longer than
+    idle_timeout seconds. A session whose machines were dropped
+    gets new ones on its next request.
+    """
+    def __init__(self, size=POOL_SIZE, idle_timeout=IDLE_TIMEOUT,
+                 clock=monotonic):
+        """
+        Args:
+            size: Most sessions to keep machines for
+            idle_timeout: Seconds a session's machines are kept unused
+            clock: Function returning the time in seconds
+        """
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self.machines = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.machines)
+
+    def __contains__(self, key):
+        return key in self.machines
+
+    def get(self, key):
+        """
+        Returns the Machines of session key, made if need be.
+        """
+        with self.lock:
+            now = self.clock()
+            self.drop_idle(now)
+            machines = self.machines.get(key)
+            if machines is None:
+                machines = Machines()
+                self.machines[key] = machines
+                while len(self.machines) > self.size:
+                    self.machines.popitem(last=False)
+            else:
+                self.machines.move_to_end(key)
+            machines.last_used = now
+            return machines
+
+    def drop_idle(self, now):
+        """
+        Drops the machines idle for too long: they are the
+        least recently used, so they are at the front.
+        """
+        while self.machines:
+            key, machines = next(iter(self.machines.items()))
+            if now - machines.last_used <= self.idle_timeout:
+                break
+            del self.machines[key]
+
+    def clear(self):
+        with self.lock:
+            self.machines.clear()
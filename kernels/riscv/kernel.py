@@ -1,6 +1,8 @@
 from ipykernel.kernelbase import Kernel
 from assembler.virtual_machine import RISCVMachine
 from assembler.assemble import assemble
+from assembler.changes import REGISTER, MEMORY, FLAG
+from assembler.memory import hex_addr
 
 
 class RiscvKernel(Kernel):
@@ -57,18 +59,20 @@ class RiscvKernel(Kernel):
         reg_changes = []
         mem_changes = []
         flag_changes = []
+        # settles the flags, so the changes include them:
+        flags = dict(self.vm_machine.flags)
+        delta = self.vm_machine.changes.delta()
+        changed_regs = set(delta[REGISTER])
         for reg in self.vm_machine.registers:
-            if reg in self.vm_machine.changes:
+            if reg in changed_regs:
                 reg_val = self.vm_machine.registers[reg]
                 reg_changes.append((reg, reg_val))
 
-        for chng in self.vm_machine.changes:
-            if "MEM" in chng:
-                loc = chng.replace("MEM", "")
-                mem_changes.append((loc, self.vm_machine.memory[loc]))
-            if "FLAG" in chng:
-                flag_nm = chng.replace("FLAG", "")
-                flag_changes.append((flag_nm, self.vm_machine.flags[flag_nm]))
+        for addr in delta[MEMORY]:
+            mem_changes.append((hex_addr(addr),
+                                self.vm_machine.memory.load(addr)))
+        for flag_nm in delta[FLAG]:
+            flag_changes.append((flag_nm, flags[flag_nm]))
 
         return reg_changes, mem_changes, flag_changes
 
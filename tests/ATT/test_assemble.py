@@ -133,6 +133,23 @@ class AssembleTestCase(TestCase):
             assemble("mov $" + str(a) + ", %eax", intel_machine)
             self.assertEqual(intel_machine.registers["EAX"], correct)
 
+    def test_mov_scaled(self):
+        # each address has its own scale, even though
+        # the lexer shares register tokens between lines:
+        for i in range(0, NUM_TESTS):
+            a = random.randint(MIN_TEST, MAX_TEST)
+            b = random.randint(0, 100)
+            c = random.randint(0, 100)
+            intel_machine.registers["EAX"] = a
+            intel_machine.registers["EBX"] = b
+            intel_machine.registers["ECX"] = c
+            assemble("mov %eax, (%ebx,%ecx,4)", intel_machine)
+            assemble("mov (%ebx,%ecx), %edx", intel_machine)
+            self.assertEqual(intel_machine.memory[
+                hex(b + c * 4).split('x')[-1].upper()], a)
+            self.assertEqual(intel_machine.registers["EDX"],
+                             intel_machine.memory.load(b + c, 0))
+
     def test_idiv(self):
         for i in range(0, NUM_TESTS):
             a = random.randint(MIN_TEST, MAX_TEST)
@@ -17,7 +17,12 @@ from unittest import TestCase, main
 
 from assembler.tokens import MAX_INT, MIN_INT, BITS
 from assembler.virtual_machine import intel_machine, STACK_TOP, STACK_BOTTOM
+from assembler.virtual_machine import IntelMachine
 from assembler.assemble import assemble
+from assembler.changes import MEMORY
+from assembler.memory import PAGE_BITS
+from assembler.trace import INFO, DEBUG, TRACE_SIZE
+from assembler.vm_pool import VMPool
 from assembler.Intel.fp_arithmetic import convert_hex_to_decimal
 from assembler.Intel.fp_arithmetic import convert_dec_to_hex
 # from assembler.Intel.math_operations import Mathops
@@ -193,6 +198,20 @@ class AssembleTestCase(TestCase):
             assemble("pop ebx", intel_machine)
             self.assertEqual(intel_machine.registers["EBX"], correct_stack[i])
 
+    def test_stack_view(self):
+        intel_machine.re_init()
+        intel_machine.registers["EAX"] = 7
+        assemble("push eax", intel_machine)
+        # the website shows the stack top first, by hex address:
+        stack_locs = list(intel_machine.stack)
+        self.assertEqual(len(stack_locs), STACK_TOP - STACK_BOTTOM + 1)
+        self.assertEqual(stack_locs[0], hex(STACK_TOP).split('x')[-1].upper())
+        self.assertEqual(intel_machine.stack[stack_locs[0]], 7)
+        intel_machine.stack[stack_locs[0]] = 8
+        assemble("pop ebx", intel_machine)
+        self.assertEqual(intel_machine.registers["EBX"], 8)
+        self.assertEqual(intel_machine.stack[stack_locs[0]], 0)
+
     ##################
     # Other          #
     ##################
@@ -205,6 +224,178 @@ class AssembleTestCase(TestCase):
             assemble("mov eax, " + str(a), intel_machine)
             self.assertEqual(intel_machine.registers["EAX"], correct)
 
+    def test_mov_mem(self):
+        for i in range(0, NUM_TESTS):
+            a = random.randint(MIN_TEST, MAX_TEST)
+            addr = random.randint(0, STACK_TOP)
+            intel_machine.memory.clear()
+            intel_machine.registers["EAX"] = a
+            intel_machine.registers["EBX"] = addr
+            assemble("mov [ebx], eax", intel_machine)
+            # memory is shown, and set by the website, in hex:
+            mem_loc = hex(addr).split('x')[-1].upper()
+            self.assertEqual(intel_machine.memory[mem_loc], a)
+            self.assertEqual(list(intel_machine.memory), [mem_loc])
+            intel_machine.memory[mem_loc] = a + 1
+            assemble("mov ecx, [" + str(addr) + "]", intel_machine)
+            self.assertEqual(intel_machine.registers["ECX"], a + 1)
+
+    def test_shared_ints(self):
+        # small integers are shared tokens, so negating one
+        # must not change the others:
+        for i in range(0, NUM_TESTS):
+            a = random.randint(1, 1000)
+            assemble("mov eax, -" + str(a), intel_machine)
+            self.assertEqual(intel_machine.registers["EAX"], -a)
+            assemble("mov ebx, " + str(a), intel_machine)
+            self.assertEqual(intel_machine.registers["EBX"], a)
+
+    def test_mov_expr(self):
+        # address expressions are worked out left to right:
+        intel_machine.memory.clear()
+        intel_machine.registers["EBX"] = 10
+        intel_machine.registers["EAX"] = 7
+        assemble("mov [ebx + 8 - 4 + 2], eax", intel_machine)
+        self.assertEqual(intel_machine.memory["10"], 7)
+        assemble("mov [ebx - 2 - 1], eax", intel_machine)
+        self.assertEqual(intel_machine.memory["7"], 7)
+        (last_instr, error, bit_code) = assemble("mov [8 - ebx], eax",
+                                                 intel_machine)
+        self.assertNotEqual(error, "")
+
+    def test_mov_indexed(self):
+        for i in range(0, NUM_TESTS):
+            base = random.randint(0, 100)
+            index = random.randint(0, 100)
+            a = random.randint(MIN_TEST, MAX_TEST)
+            intel_machine.memory.clear()
+            intel_machine.registers["EBX"] = base
+            intel_machine.registers["ECX"] = index
+            intel_machine.registers["EAX"] = a
+            assemble("mov [ebx + ecx + 4], eax", intel_machine)
+            self.assertEqual(intel_machine.memory.load(base + index + 4), a)
+
+    def test_changes(self):
+        intel_machine.changes_init()
+        intel_machine.registers["EAX"] = 7
+        assemble("mov [31], eax\nmov ebx, eax", intel_machine)
+        # the website looks changes up as strings:
+        self.assertIn("MEM1F", intel_machine.changes)
+        self.assertIn("EBX", intel_machine.changes)
+        self.assertNotIn("ECX", intel_machine.changes)
+        self.assertEqual(intel_machine.changes.delta()[MEMORY], [31])
+        intel_machine.changes_init()
+        self.assertEqual(len(intel_machine.changes), 0)
+
+    def test_changes_mem_dest(self):
+        intel_machine.memory.clear()
+        intel_machine.changes_init()
+        intel_machine.registers["EBX"] = 20
+        assemble("add [ebx], 3\ninc [ebx + 1]\nneg [ebx + 2]",
+                 intel_machine)
+        self.assertEqual(intel_machine.memory["14"], 3)
+        self.assertEqual(intel_machine.changes.delta()[MEMORY],
+                         [20, 21, 22])
+        self.assertNotIn("EBX", intel_machine.changes)
+
+    def test_trace(self):
+        intel_machine.debug = ""
+        intel_machine.trace.level = INFO
+        assemble(".data\ny DW 3\n.text\nmov ecx, y", intel_machine)
+        self.assertNotIn("Symbol y", intel_machine.debug)
+        intel_machine.trace.level = DEBUG
+        assemble(".data\ny DW 4\n.text\nmov ecx, y", intel_machine)
+        self.assertIn("Symbol y", intel_machine.debug)
+        intel_machine.trace.level = INFO
+        for i in range(TRACE_SIZE + 1):
+            intel_machine.trace.log(INFO, str(i))
+        self.assertEqual(len(intel_machine.trace), TRACE_SIZE)
+        self.assertEqual(intel_machine.trace.last(2),
+                         [str(TRACE_SIZE - 1), str(TRACE_SIZE)])
+
+    def test_mem_size(self):
+        mem_size = 1 << 20
+        vm = IntelMachine(mem_size=mem_size, stack_size=64)
+        vm.flavor = "intel"
+        vm.base = "dec"
+        assemble("mov eax, 7\nmov [" + str(mem_size - 1) + "], eax\n"
+                 + "push eax", vm)
+        self.assertEqual(vm.memory.load(mem_size - 1), 7)
+        self.assertEqual(vm.registers["ESP"], mem_size + 62)
+        self.assertEqual(vm.stack.load(mem_size + 63), 7)
+        vm.re_init()
+        self.assertEqual(len(vm.memory), 0)
+        self.assertEqual(vm.stack.load(mem_size + 63), 0)
+        self.assertEqual(vm.registers["ESP"], mem_size + 63)
+
+    def test_mem_size_push_pop(self):
+        vm = IntelMachine(mem_size=4096, stack_size=16)
+        vm.flavor = "intel"
+        vm.base = "dec"
+        (last_instr, error, bit_code) = assemble(
+            "mov eax, 3\nmov ebx, 4\nmov [5], eax\nmov [100000], ebx\n"
+            + "push eax\npush ebx\npop ecx\npop edx", vm)
+        self.assertEqual(error, "")
+        self.assertEqual(vm.registers["ECX"], 4)
+        self.assertEqual(vm.registers["EDX"], 3)
+        self.assertEqual(vm.registers["ESP"], 4096 + 15)
+        # only the pages and stack cells written are kept:
+        self.assertEqual(sorted(vm.memory.pages),
+                         [0, 100000 >> PAGE_BITS])
+        self.assertEqual(len(vm.stack.cells), 2)
+        vm.re_init()
+        self.assertEqual(vm.memory.pages, {})
+        self.assertEqual(vm.stack.cells, {})
+        self.assertEqual(vm.memory.load(100000), 0)
+        self.assertEqual(vm.registers["ESP"], 4096 + 15)
+
+    def test_vm_pool(self):
+        now = [0]
+        pool = VMPool(size=2, idle_timeout=10, clock=lambda: now[0])
+        first = pool.get("a")
+        assemble("mov eax, 3", first.intel_machine)
+        self.assertIs(pool.get("a"), first)
+        # sessions don't share machines:
+        self.assertEqual(pool.get("b").intel_machine.registers["EAX"], 0)
+        pool.get("a")
+        pool.get("c")
+        self.assertNotIn("b", pool)
+        self.assertEqual(first.intel_machine.registers["EAX"], 3)
+        now[0] = 11
+        pool.get("c")
+        self.assertNotIn("a", pool)
+        self.assertEqual(len(pool), 1)
+
+    def test_long_data(self):
+        values = [random.randint(0, 100) for i in range(3000)]
+        intel_machine.re_init()
+        assemble(".data\nx DW " + ", ".join(str(v) for v in values)
+                 + "\n.text\nmov eax, [2999]", intel_machine)
+        self.assertEqual(intel_machine.registers["EAX"], values[-1])
+
+    def test_dup_data(self):
+        intel_machine.re_init()
+        assemble(".data\nx DW 1, 2, 300 DUP (7), 3\ny DW 5000 DUP (0)\n"
+                 + ".text\nmov eax, [302]", intel_machine)
+        self.assertEqual(intel_machine.registers["EAX"], 3)
+        self.assertEqual(intel_machine.memory["1"], 2)
+        self.assertEqual(intel_machine.memory["12D"], 7)
+        self.assertEqual(intel_machine.symbols["y"], 303)
+        self.assertEqual(len(intel_machine.memory), 5303)
+
+    def test_dup_paged(self):
+        # declarations past the machine's memory size are stored
+        # a page at a time too, not cell by cell:
+        vm = IntelMachine()
+        vm.flavor = "intel"
+        vm.base = "dec"
+        assemble(".data\narr DD 100000 DUP (5)\n.text\nmov eax, [99999]",
+                 vm)
+        self.assertEqual(vm.registers["EAX"], 5)
+        self.assertEqual(vm.memory.far_cells, {})
+        self.assertEqual(len(vm.memory.pages), 25)
+        self.assertEqual(len(vm.memory), 100000)
+
     def test_idiv(self):
         for i in range(0, NUM_TESTS):
             a = random.randint(MIN_TEST, MAX_TEST)
@@ -223,6 +414,17 @@ class AssembleTestCase(TestCase):
             self.assertEqual(intel_machine.registers["EDX"],
                              correct_remainder)
 
+    def test_float_stack(self):
+        intel_machine.re_init()
+        assemble("fld 1.5\nfld 2.5\nfld 4.0", intel_machine)
+        self.assertEqual([intel_machine.registers[f'ST{i}'] for i in range(3)],
+                         [4.0, 2.5, 1.5])
+        assemble("faddp st1, st0", intel_machine)
+        self.assertEqual([intel_machine.registers[f'ST{i}'] for i in range(3)],
+                         [6.5, 1.5, 0.0])
+        self.assertEqual(list(intel_machine.registers)[-8:],
+                         [f'ST{i}' for i in range(8)])
+
     def test_cmp_eq(self):
         intel_machine.registers["EAX"] = 1
         intel_machine.registers["EBX"] = 1
@@ -241,6 +443,44 @@ class AssembleTestCase(TestCase):
         self.assertEqual(intel_machine.flags["ZF"], 0)
         self.assertEqual(intel_machine.flags["SF"], 1)
 
+    def test_cmp_carry_overflow(self):
+        intel_machine.registers["EAX"] = 0
+        intel_machine.registers["EBX"] = 1
+        assemble("cmp eax, ebx", intel_machine)
+        self.assertEqual(intel_machine.flags["CF"], 1)
+        self.assertEqual(intel_machine.flags["OF"], 0)
+        intel_machine.registers["EAX"] = MIN_INT
+        assemble("cmp eax, ebx", intel_machine)
+        self.assertEqual(intel_machine.flags["CF"], 0)
+        self.assertEqual(intel_machine.flags["OF"], 1)
+        # MIN_INT - 1 wraps to MAX_INT in 32 bits:
+        self.assertEqual(intel_machine.flags["SF"], 0)
+        intel_machine.registers["EAX"] = -2
+        assemble("cmp eax, ebx", intel_machine)
+        self.assertEqual(intel_machine.flags["SF"], 1)
+        self.assertEqual(intel_machine.flags["OF"], 0)
+
+    def test_cmp_then_add(self):
+        # add sets only some of the flags: the ones cmp set must stay
+        intel_machine.re_init()
+        intel_machine.changes_init()
+        (last_instr, error, bit_code) = assemble(
+            "mov eax, 5\nmov ebx, 5\nmov edx, 111\ncmp eax, ebx\n"
+            + "add ecx, 1\nje equal\njmp done\nequal: mov edx, 222\n"
+            + "done: mov eax, eax", intel_machine)
+        self.assertEqual(error, "")
+        self.assertEqual(intel_machine.registers["EDX"], 222)
+        self.assertEqual(intel_machine.flags["ZF"], 1)
+        self.assertIn("FLAGZF", intel_machine.changes)
+
+    def test_add_carry(self):
+        intel_machine.registers["EAX"] = -1
+        intel_machine.registers["EBX"] = 1
+        assemble("add eax, ebx", intel_machine)
+        self.assertEqual(intel_machine.registers["EAX"], 0)
+        self.assertEqual(intel_machine.flags["CF"], 1)
+        self.assertEqual(intel_machine.flags["OF"], 0)
+
 
 if __name__ == '__main__':
     main()
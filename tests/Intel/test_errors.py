@@ -15,7 +15,7 @@ from assembler.errors import INVALID_INSTR
 from assembler.errors import INVALID_NUM_ARGS, INVALID_MEM_LOC
 from assembler.errors import MISSING_COMMA, MISSING_DATA, INVALID_TOKEN
 from assembler.errors import REG_UNWRITABLE, STACK_OVERFLOW, STACK_UNDERFLOW
-from assembler.errors import UNKNOWN_NM
+from assembler.errors import UNKNOWN_NM, INVALID_LABEL
 
 
 intel_machine.base = "dec"
@@ -44,6 +44,12 @@ class ErrorTestCase(TestCase):
                                              intel_machine)
         self.assertTrue(error.startswith(UNKNOWN_NM))
 
+    def test_invalid_label(self):
+        intel_machine.re_init()
+        (output, error, bit_code) = assemble("jmp 5",
+                                             intel_machine)
+        self.assertTrue(error.startswith(INVALID_LABEL))
+
     def test_reg_unwritable(self):
         (output, error, bit_code) = assemble("mov EIP, 10",
                                              intel_machine)
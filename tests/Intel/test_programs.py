@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
+import os
 import sys
+import tempfile
 sys.path.append(".") # noqa
 
-from assembler.virtual_machine import intel_machine
+from assembler.virtual_machine import intel_machine, IntelMachine
 
 from unittest import TestCase, main
 
-from assembler.assemble import assemble
+from assembler.assemble import assemble, assemble_file, compile_file
+from assembler.assemble import RunBudget
+from assembler.program_cache import program_cache, program_key
+from assembler.object_file import find_object
+from assembler.line_cache import get_line_caches
 """
 Test entire programs.
 
@@ -49,6 +55,134 @@ class TestPrograms(TestCase):
         self.run_intel_test_code("tests/Intel/loop.asm")
         self.assertEqual(intel_machine.registers["ECX"], 16)
 
+    def test_loop_budget(self):
+        budget = RunBudget()
+        intel_machine.re_init()
+        intel_machine.base = "dec"
+        intel_machine.flavor = "intel"
+        test_code = self.read_test_code("tests/Intel/loop.asm")
+        (last_instr, error, bit_code) = assemble(test_code, intel_machine,
+                                                 budget=budget)
+        self.assertEqual(error, "")
+        self.assertEqual(budget.instrs, 85)
+        self.assertTrue(budget.elapsed > 0)
+
+        budget = RunBudget(max_instrs=10)
+        intel_machine.re_init()
+        (last_instr, error, bit_code) = assemble(test_code, intel_machine,
+                                                 budget=budget)
+        self.assertTrue(error.startswith("Possible infinite loop"))
+        self.assertEqual(budget.instrs, 10)
+
+    def test_program_cache(self):
+        intel_machine.re_init()
+        intel_machine.base = "dec"
+        intel_machine.flavor = "intel"
+        program_cache.clear()
+        test_code = self.read_test_code("tests/Intel/loop.asm")
+        # step through the first few instructions, as the website does:
+        for i in range(4):
+            assemble(test_code, intel_machine, step=True)
+        self.assertEqual(program_cache.misses, 1)
+        self.assertEqual(program_cache.hits, 3)
+        self.assertEqual(len(program_cache), 1)
+        intel_machine.re_init()
+        (last_instr, error, bit_code) = assemble(test_code, intel_machine)
+        self.assertEqual(error, "")
+        self.assertEqual(intel_machine.registers["ECX"], 16)
+        self.assertEqual(program_cache.hits, 4)
+
+    def test_program_shared(self):
+        program_cache.clear()
+        other_machine = IntelMachine()
+        for vm in (intel_machine, other_machine):
+            vm.re_init()
+            vm.base = "dec"
+            vm.flavor = "intel"
+        test_code = self.read_test_code("tests/Intel/data.asm")
+        assemble(test_code, intel_machine)
+        intel_machine.registers["EAX"] = 0
+        assemble(test_code, other_machine)
+        self.assertEqual(program_cache.hits, 1)
+        self.assertEqual(other_machine.registers["EAX"], 8)
+        self.assertEqual(intel_machine.registers["EAX"], 0)
+
+    def test_line_cache(self):
+        vm = IntelMachine()
+        vm.base = "dec"
+        vm.flavor = "intel"
+        lines = get_line_caches(vm)
+        test_code = self.read_test_code("tests/Intel/loop.asm")
+        assemble(test_code, vm)
+        self.assertEqual(lines.lexed.misses, 8)
+        self.assertEqual(lines.parsed.misses, 8)
+        # only the line edited is lexed and parsed again:
+        test_code = test_code.replace("mov eax, 16", "mov eax, 8")
+        vm.re_init()
+        assemble(test_code, vm)
+        self.assertEqual(vm.registers["ECX"], 8)
+        self.assertEqual(lines.lexed.misses, 9)
+        self.assertEqual(lines.parsed.misses, 9)
+        # a new line moves the labels, so the jumps are parsed again:
+        test_code = "mov edx, 0\n" + test_code
+        vm.re_init()
+        assemble(test_code, vm)
+        self.assertEqual(vm.registers["ECX"], 8)
+        self.assertEqual(vm.labels["loop"], 3)
+        self.assertEqual(lines.lexed.misses, 10)
+        self.assertEqual(lines.parsed.misses, 12)
+
+    def test_assemble_file(self):
+        # loop.asm jumps forward, to a label we have yet to read:
+        vm = IntelMachine()
+        vm.base = "dec"
+        vm.flavor = "intel"
+        (last_instr, error, bit_code) = assemble_file("tests/Intel/loop.asm",
+                                                      vm)
+        self.assertEqual(error, "")
+        self.assertEqual(vm.registers["ECX"], 16)
+        self.assertEqual(vm.labels["done"], 7)
+
+    def test_object_file(self):
+        vm = IntelMachine()
+        vm.base = "dec"
+        vm.flavor = "intel"
+        with tempfile.TemporaryDirectory() as obj_dir:
+            obj_nm = compile_file("tests/Intel/mem_register_test.asm", vm,
+                                  os.path.join(obj_dir, "test.emo"))
+            assemble_file("tests/Intel/mem_register_test.asm", vm)
+            registers = dict(vm.registers)
+            memory = dict(vm.memory)
+            vm = IntelMachine()
+            vm.base = "dec"
+            vm.flavor = "intel"
+            (last_instr, error, bit_code) = assemble_file(obj_nm, vm)
+            self.assertEqual(error, "")
+            self.assertEqual(dict(vm.registers), registers)
+            self.assertEqual(dict(vm.memory), memory)
+
+    def test_object_crlf(self):
+        # the website sends code with CRLF line endings:
+        vm = IntelMachine()
+        vm.base = "dec"
+        vm.flavor = "intel"
+        test_code = self.read_test_code("tests/Intel/mem_register_test.asm")
+        web_code = test_code.replace("\n", "\r\n") + "\r\n"
+        with tempfile.TemporaryDirectory() as obj_dir:
+            compile_file("tests/Intel/mem_register_test.asm", vm,
+                         obj_dir=obj_dir)
+            key = program_key(web_code, vm.flavor, vm.base)
+            self.assertIsNotNone(find_object(key, vm, obj_dir))
+            program_cache.clear()
+            (last_instr, error, bit_code) = assemble(web_code, vm,
+                                                     obj_dir=obj_dir)
+            self.assertEqual(error, "")
+            self.assertEqual(program_cache.misses, 1)
+            registers = dict(vm.registers)
+        vm.re_init()
+        assemble_file("tests/Intel/mem_register_test.asm", vm)
+        self.assertEqual(dict(vm.registers), registers)
+
     def test_power(self):
         self.run_intel_test_code("tests/Intel/power.asm")
         self.assertEqual(intel_machine.registers["EDX"], 65536)
@@ -219,6 +219,24 @@ class AssembleTestCase(TestCase):
             result = result * -1 if is_result_neg else result
             self.assertEqual(result, correct)
 
+    def test_sw_lw(self):
+        for i in range(0, NUM_TESTS):
+            a = random.randint(MIN_TEST, MAX_TEST)
+            # anywhere in the 32-bit address space:
+            addr = random.randrange(0, 2 ** 32, 4)
+            mips_machine.memory.clear()
+            mips_machine.registers["R8"] = a
+            mips_machine.registers["R9"] = addr
+            assemble("40000 SW R8, 0(R9)\n40004 LW R10, 0(R9)",
+                     mips_machine)
+            self.assertEqual(mips_machine.registers["R10"], a)
+            self.assertEqual(list(mips_machine.memory),
+                             [hex(addr).split('x')[-1].upper()])
+        mips_machine.registers["R9"] = 2 ** 32
+        (last_instr, error, bit_code) = assemble("40000 SW R8, 0(R9)",
+                                                 mips_machine)
+        self.assertTrue(error.startswith("Invalid memory location"))
+
     def test_adds(self):
         self.two_op_test(opfunc.add, "ADD.S", True)
 
@@ -50,6 +50,12 @@ class TestPrograms(TestCase):
         self.run_mips_test_code("power.asm")
         self.assertEqual(mips_machine.registers["R8"], 65536)
 
+    def test_power_label(self):
+        # JAL to a label, returning by JR R31:
+        self.run_mips_test_code("power_label.asm")
+        self.assertEqual(mips_machine.registers["R8"], 65536)
+        self.assertEqual(mips_machine.registers["R31"], 0x40000C)
+
     def test_gt(self):
         self.run_mips_test_code("gt.asm")
         self.assertEqual(mips_machine.registers["R8"], 17)
@@ -1,5 +1,20 @@
 import os
 
+from assembler.assemble import compile_file
+from assembler.errors import Error
+from assembler.virtual_machine import intel_machine, mips_machine
+from assembler.virtual_machine import riscv_machine
+
+OBJ_DIR = "Emu86/objects"
+
+sample_flavors = {
+    "tests/Intel": (intel_machine, "intel"),
+    "tests/ATT": (intel_machine, "att"),
+    "tests/MIPS_ASM": (mips_machine, "mips_asm"),
+    "tests/MIPS_MML": (mips_machine, "mips_mml"),
+    "tests/RISCV": (riscv_machine, "riscv"),
+}
+
 link_names = {
     "power.asm": "Raise a number to a power",
     "array.asm": "Declare an array",
@@ -80,9 +95,30 @@ def create_sidebar():
     file_name.close()
 
 
+def compile_samples():
+    """
+    Compiles the sample programs to object files the website
+    loads instead of assembling them.
+    """
+    os.makedirs(OBJ_DIR, exist_ok=True)
+    for dire, (vm, flavor) in sample_flavors.items():
+        for file in sorted(os.listdir(dire)):
+            if not (file.endswith(".asm") and file in link_names):
+                continue
+            for base in ("dec", "hex"):
+                vm.re_init()
+                vm.flavor = flavor
+                vm.base = base
+                try:
+                    compile_file(dire + "/" + file, vm, obj_dir=OBJ_DIR)
+                except Error:
+                    pass    # not a program in this base
+
+
 def main():
     create_href()
     create_sidebar()
+    compile_samples()
 
 
 main()